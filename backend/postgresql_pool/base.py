@@ -0,0 +1,140 @@
+"""
+PostgreSQL backend that takes connections from an in-process pool.
+
+Django closes a connection at the end of every request when ``CONN_MAX_AGE``
+is 0; here closing returns it to a pool shared by the threads of the process,
+so a connection is reused by whichever request needs one next instead of
+sitting idle with the thread that opened it. Configured through ``OPTIONS``
+(``pool_size``, ``pool_timeout``), which ``DATABASE_URL`` query parameters
+fill in.
+"""
+import os
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    At most ``size`` connections, checked out and in by request threads;
+    a checkout waits up to ``timeout`` seconds for one to come back. Idle
+    connections are reused newest first and pinged first when health checks
+    are on, so one the server has dropped is replaced instead of failing.
+    """
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self, connect, health_check):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise base.Database.OperationalError(
+                f'No database connection free in the pool of {self.size} after {self.timeout}s'
+            )
+        try:
+            while True:
+                with self._lock:
+                    connection = self._idle.pop() if self._idle else None
+                if connection is None:
+                    return connect()
+                if not connection.closed and (not health_check or self._ping(connection)):
+                    return connection
+                self._discard(connection)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        try:
+            status = None if discard or connection.closed else connection.info.transaction_status
+            if status in (extensions.TRANSACTION_STATUS_INTRANS, extensions.TRANSACTION_STATUS_INERROR):
+                connection.rollback()
+                status = connection.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_IDLE:
+                with self._lock:
+                    self._idle.append(connection)
+            else:
+                self._discard(connection)
+        except base.Database.Error:
+            self._discard(connection)
+        finally:
+            self._slots.release()
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._discard(connection)
+
+    @staticmethod
+    def _ping(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except base.Database.Error:
+            return False
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except base.Database.Error:
+            pass
+
+
+def get_pool(alias, size, timeout):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        # A forked worker must not share its parent's sockets
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[alias] = ConnectionPool(size, timeout)
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.clear()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool_size', None)
+        params.pop('pool_timeout', None)
+        return params
+
+    @property
+    def pool(self):
+        options = self.settings_dict['OPTIONS']
+        return get_pool(self.alias, int(options.get('pool_size', 10)), float(options.get('pool_timeout', 30)))
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+            self.settings_dict['CONN_HEALTH_CHECKS'],
+        )
+        # A reused session already carries the configured isolation level;
+        # the wrapper still needs to know it
+        self.isolation_level = base.IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', base.IsolationLevel.READ_COMMITTED)
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # Closed inside an atomic block, the wrapper keeps the object
+                # until the block exits, so it must not go back to the pool
+                self.pool.release(self.connection, discard=self.in_atomic_block)
@@ -1,7 +1,9 @@
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -13,6 +15,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-fallback-secret-key-for-development-only')
 DEBUG = os.environ.get('DEBUG', 'False').lower() == 'true'
+TESTING = sys.argv[1:2] == ['test']
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1,.onrender.com').split(',')
 
 
@@ -25,6 +28,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework_simplejwt',
     'rest_framework',
     'corsheaders',
@@ -62,7 +66,7 @@ SIMPLE_JWT = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ),
@@ -78,6 +82,73 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20
 }
 
+# Full-text search: 'auto' uses PostgreSQL tsvector search when available and
+# falls back to substring matching elsewhere (e.g. SQLite)
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+SEARCH_CONFIG = 'english'
+SEARCH_MAX_LIMIT = 50
+SEARCH_SUGGEST_MAX_LIMIT = 20
+SEARCH_SUGGEST_CACHE_TTL = 30  # seconds; hot prefixes are served from memory
+
+# Users resolved from JWTs are cached per process; saves and deletes evict them
+# from the process that made the change only, so other workers may act on a
+# changed role, deactivation or password for up to JWT_USER_CACHE_TTL
+JWT_USER_CACHE_TTL = int(os.environ.get('JWT_USER_CACHE_TTL', 300))  # seconds
+JWT_USER_CACHE_MAX_ENTRIES = int(os.environ.get('JWT_USER_CACHE_MAX_ENTRIES', 10000))
+
+# last_activity is written at most once per interval per user, in bulk
+USER_ACTIVITY_UPDATE_INTERVAL = int(os.environ.get('USER_ACTIVITY_UPDATE_INTERVAL', 300))  # seconds
+USER_ACTIVITY_FLUSH_INTERVAL = int(os.environ.get('USER_ACTIVITY_FLUSH_INTERVAL', 30))  # seconds
+
+# Anonymous list responses are cached under per-model version keys that model
+# signals bump. 'local' keeps entries in process memory (LRU); any other value
+# names a CACHES alias to share entries between workers. Versions live in the
+# RESPONSE_CACHE_VERSION_ALIAS cache, which should be shared across workers in
+# production for immediate invalidation; otherwise the TTL bounds staleness.
+RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'local')
+RESPONSE_CACHE_VERSION_ALIAS = 'default'
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 60))  # seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 500))
+
+# Photo and reward images get resized WebP/JPEG renditions next to the original,
+# rendered after upload by `manage.py run_workers` (see JOB_QUEUE_* below)
+MEDIA_RENDITION_WIDTHS = (160, 480, 960, 1600)
+MEDIA_RENDITION_FORMATS = ('webp', 'jpeg')
+MEDIA_RENDITION_QUALITY = 80
+
+# Background jobs live in the core_backgroundjob table and are run by
+# `manage.py run_workers`. Failed jobs retry after JOB_QUEUE_RETRY_DELAY seconds,
+# doubling up to JOB_QUEUE_RETRY_MAX_DELAY, and are kept as dead letters (see
+# the admin) after JOB_QUEUE_MAX_ATTEMPTS. A job still running after
+# JOB_QUEUE_VISIBILITY_TIMEOUT seconds is assumed lost and handed out again.
+# Workers must see the same MEDIA_ROOT as the web process; start.sh runs them
+# alongside gunicorn for that reason.
+JOB_QUEUE_MAX_ATTEMPTS = int(os.environ.get('JOB_QUEUE_MAX_ATTEMPTS', 5))
+JOB_QUEUE_RETRY_DELAY = 30
+JOB_QUEUE_RETRY_MAX_DELAY = 6 * 60 * 60
+JOB_QUEUE_VISIBILITY_TIMEOUT = 15 * 60
+
+# Photos reaching this many likes are featured for FEATURED_PHOTO_DAYS
+FEATURED_PHOTO_LIKE_THRESHOLD = int(os.environ.get('FEATURED_PHOTO_LIKE_THRESHOLD', 10))
+FEATURED_PHOTO_DAYS = int(os.environ.get('FEATURED_PHOTO_DAYS', 30))
+
+# Periodic maintenance run by `manage.py run_scheduler` (one worker process;
+# extra instances are safe, each job takes a database lock before running).
+# gc_media and expire_uploads scan MEDIA_ROOT, so the scheduler must run where
+# it is mounted; start.sh runs it alongside gunicorn.
+# Keys are management command names; intervals and jitter are in seconds.
+SCHEDULER_JOBS = {
+    'update_featured_photos': {'every': 15 * 60, 'jitter': 60},
+    'expire_uploads': {'every': 60 * 60, 'jitter': 5 * 60},
+    'reconcile_counters': {'every': 24 * 60 * 60, 'jitter': 30 * 60},
+    'gc_media': {'every': 24 * 60 * 60, 'jitter': 30 * 60},
+}
+SCHEDULER_HISTORY_DAYS = 30
+
+# Near-duplicate photos: perceptual hashes within this many bits (of 64) match
+PHOTO_DUPLICATE_MAX_DISTANCE = int(os.environ.get('PHOTO_DUPLICATE_MAX_DISTANCE', 10))
+PHOTO_DUPLICATE_INDEX_REBUILD = 600  # seconds between full rebuilds of the in-memory index
+
 ''''CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
@@ -120,20 +191,75 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.environ.get('DB_NAME', ''),
-        'USER': os.environ.get('DB_USER', ''),
-        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
-        'HOST': os.environ.get('DB_HOST', ''),
-        'PORT': os.environ.get('DB_PORT', '5432'),
+# DATABASE_URL (set by render.yaml) takes precedence over the DB_* variables;
+# with neither, a local SQLite file is used when DEBUG is on or tests are
+# running, and startup fails otherwise.
+# DB_CONN_MAX_AGE keeps a connection open across requests for that many seconds
+# instead of reconnecting (and redoing the TLS handshake) on every request;
+# DB_CONN_HEALTH_CHECKS pings a reused connection before its first query in a
+# request, so a database restart costs a reconnect rather than a failed request.
+# DB_POOL_SIZE > 0 (or ?pool_size= on DATABASE_URL) switches to an in-process
+# pool shared by a process's threads, for threaded gunicorn workers; connections
+# then go back to the pool after each request. Compare with
+# `manage.py benchmark_connections`.
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))  # seconds
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true'
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+
+if os.environ.get('DATABASE_URL'):
+    DATABASES = {
+        'default': dj_database_url.parse(
+            os.environ['DATABASE_URL'], conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=DB_CONN_HEALTH_CHECKS
+        )
     }
-}
+elif os.environ.get('DB_NAME'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', ''),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+        }
+    }
+elif DEBUG or TESTING:
+    # No PostgreSQL configured (local development, `manage.py test`): search
+    # falls back to substring matching and suggestions to prefix matching
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+else:
+    raise ImproperlyConfigured('Set DATABASE_URL or DB_NAME (SQLite is only used with DEBUG or for tests)')
+# The pool backend builds on the PostgreSQL one; other engines ignore DB_POOL_SIZE
+if DB_POOL_SIZE and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default'].setdefault('OPTIONS', {}).setdefault('pool_size', DB_POOL_SIZE)
+if DATABASES['default'].get('OPTIONS', {}).get('pool_size'):
+    DATABASES['default']['ENGINE'] = 'backend.postgresql_pool'
+    DATABASES['default']['CONN_MAX_AGE'] = 0
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
+# Uploads are served by media.views.serve_media. Behind nginx set
+# MEDIA_ACCEL=x-accel-redirect with an internal location at MEDIA_ACCEL_PREFIX
+# aliased to MEDIA_ROOT (or x-sendfile for Apache/lighttpd) so the proxy
+# sends the bytes; by default Django streams them itself.
+MEDIA_ACCEL = os.environ.get('MEDIA_ACCEL', '')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_CACHE_MAX_AGE = 60 * 60  # seconds, for files that are not content-addressed
+
+# Resumable document uploads (/api/document-uploads/). Sessions idle for
+# MEDIA_UPLOAD_EXPIRY_HOURS are removed by `manage.py expire_uploads`.
+MEDIA_UPLOAD_CHUNK_MAX_SIZE = 8 * 1024 * 1024
+MEDIA_UPLOAD_MAX_SIZE = 500 * 1024 * 1024
+MEDIA_UPLOAD_EXPIRY_HOURS = 24
+
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
@@ -0,0 +1,94 @@
+import atexit
+import threading
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+
+class ActivityBuffer:
+    """
+    In-process write-behind buffer for ``User.last_activity``.
+
+    Each user is accepted at most once per ``interval`` seconds; accepted
+    timestamps are kept in memory and written with one bulk UPDATE every
+    ``flush_interval`` seconds and at interpreter shutdown.
+    """
+
+    def __init__(self, interval, flush_interval):
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_accepted = {}
+        self._timer = None
+
+    def record(self, user_id, when=None):
+        when = when or timezone.now()
+        with self._lock:
+            last = self._last_accepted.get(user_id)
+            if last is not None and (when - last).total_seconds() < self.interval:
+                return False
+            self._last_accepted[user_id] = when
+            self._pending[user_id] = when
+            self._schedule()
+        return True
+
+    def _schedule(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # Timer threads get their own connections; don't leave them open.
+            connections.close_all()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._timer = None
+            cutoff = timezone.now() - timezone.timedelta(seconds=self.interval)
+            self._last_accepted = {
+                user_id: seen for user_id, seen in self._last_accepted.items() if seen >= cutoff
+            }
+        if pending:
+            write_last_activity(pending)
+        return len(pending)
+
+
+def write_last_activity(timestamps):
+    """
+    Apply ``{user_id: timestamp}`` to ``User.last_activity`` in one statement:
+    ``UPDATE ... FROM (VALUES ...)`` on PostgreSQL, a CASE expression elsewhere.
+    """
+    from .models import User
+
+    connection = connections[router.db_for_write(User)]
+    with transaction.atomic(using=connection.alias):
+        if connection.vendor == 'postgresql':
+            qn = connection.ops.quote_name
+            rows = ', '.join(['(%s, %s::timestamptz)'] * len(timestamps))
+            params = [value for item in timestamps.items() for value in item]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {qn(User._meta.db_table)} AS u SET last_activity = v.seen '
+                    f'FROM (VALUES {rows}) AS v(id, seen) WHERE u.id = v.id',
+                    params
+                )
+        else:
+            User.objects.filter(pk__in=timestamps).update(last_activity=Case(
+                *[When(pk=user_id, then=Value(seen)) for user_id, seen in timestamps.items()],
+                output_field=DateTimeField(),
+            ))
+
+
+activity_buffer = ActivityBuffer(
+    interval=getattr(settings, 'USER_ACTIVITY_UPDATE_INTERVAL', 300),
+    flush_interval=getattr(settings, 'USER_ACTIVITY_FLUSH_INTERVAL', 30),
+)
+atexit.register(activity_buffer.flush)
@@ -1,9 +1,18 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from django.utils.html import format_html
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+from media.renditions import smallest_rendition
+from media.similarity import DUPLICATE_MAX_DISTANCE, photo_index
+from .authentication import invalidate_users
+from .featuring import set_featured
+from .response_cache import bump_versions
+from .tasks import requeue
 from .models import (
     User, Category, Photo, Reward, Document, Comment, 
-    Like, RepresentativeRequest, FeaturedPhoto
+    Like, RepresentativeRequest, FeaturedPhoto, JobRun, BackgroundJob, DeadJob
 )
 
 @admin.register(User)
@@ -33,12 +42,19 @@ class CustomUserAdmin(UserAdmin):
     actions = ['make_representative', 'remove_representative']
     
     def make_representative(self, request, queryset):
-        updated = queryset.update(is_representative=True, user_type='representative')
+        user_ids = list(queryset.values_list('pk', flat=True))
+        updated = User.objects.filter(pk__in=user_ids).update(is_representative=True, user_type='representative')
+        # update() skips post_save, so evict the cached JWT users explicitly
+        invalidate_users(user_ids)
+        bump_versions(User)
         self.message_user(request, f'{updated} users marked as representatives.')
     make_representative.short_description = "Mark selected users as representatives"
     
     def remove_representative(self, request, queryset):
-        updated = queryset.update(is_representative=False, user_type='student')
+        user_ids = list(queryset.values_list('pk', flat=True))
+        updated = User.objects.filter(pk__in=user_ids).update(is_representative=False, user_type='student')
+        invalidate_users(user_ids)
+        bump_versions(User)
         self.message_user(request, f'{updated} users removed from representatives.')
     remove_representative.short_description = "Remove selected users from representatives"
 
@@ -61,32 +77,58 @@ class PhotoAdmin(admin.ModelAdmin):
                    'created_at', 'image_preview')
     list_filter = ('category', 'photo_type', 'is_featured', 'is_approved', 'created_at')
     search_fields = ('title', 'description', 'uploaded_by__username')
-    readonly_fields = ('created_at', 'updated_at', 'image_preview')
+    readonly_fields = ('created_at', 'updated_at', 'image_preview', 'possible_duplicates')
     list_editable = ('is_featured', 'is_approved')
     actions = ['approve_photos', 'feature_photos', 'unfeature_photos']
     
     def total_likes_display(self, obj):
-        return obj.total_likes()
+        return obj.like_count
     total_likes_display.short_description = 'Likes'
+    total_likes_display.admin_order_field = 'like_count'
     
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="100" height="100" style="object-fit: cover;" />', obj.image.url)
+            # The smallest rendition instead of the full-size original, once rendered
+            thumbnail = smallest_rendition(obj.renditions)
+            url = default_storage.url(thumbnail) if thumbnail else obj.image.url
+            return format_html('<img src="{}" width="100" height="100" style="object-fit: cover;" />', url)
         return "No Image"
     image_preview.short_description = 'Preview'
     
+    def possible_duplicates(self, obj):
+        if not obj.perceptual_hash:
+            return "Not processed yet"
+        matches = photo_index.search(obj.perceptual_hash, DUPLICATE_MAX_DISTANCE, exclude=obj.pk)[:20]
+        titles = Photo.objects.only('title').in_bulk([pk for _, pk in matches])
+        return format_html_join(
+            format_html('<br>'), '<a href="{}">{}</a> ({} bits)',
+            (
+                (reverse('admin:core_photo_change', args=[pk]), titles[pk].title, distance)
+                for distance, pk in matches if pk in titles
+            ),
+        ) or "None found"
+    possible_duplicates.short_description = 'Possible duplicates'
+    
     def approve_photos(self, request, queryset):
-        updated = queryset.update(is_approved=True)
+        # update() skips auto_now; updated_at feeds the ETag
+        updated = queryset.update(is_approved=True, updated_at=timezone.now())
+        bump_versions(Photo)
         self.message_user(request, f'{updated} photos approved.')
     approve_photos.short_description = "Approve selected photos"
     
     def feature_photos(self, request, queryset):
-        updated = queryset.update(is_featured=True)
+        photo_ids = list(queryset.filter(is_featured=False).values_list('pk', flat=True))
+        updated = Photo.objects.filter(pk__in=photo_ids).update(is_featured=True, updated_at=timezone.now())
+        set_featured(photo_ids, True)
+        bump_versions(Photo)
         self.message_user(request, f'{updated} photos featured.')
     feature_photos.short_description = "Feature selected photos"
     
     def unfeature_photos(self, request, queryset):
-        updated = queryset.update(is_featured=False)
+        photo_ids = list(queryset.filter(is_featured=True).values_list('pk', flat=True))
+        updated = Photo.objects.filter(pk__in=photo_ids).update(is_featured=False, updated_at=timezone.now())
+        set_featured(photo_ids, False)
+        bump_versions(Photo)
         self.message_user(request, f'{updated} photos unfeatured.')
     unfeature_photos.short_description = "Unfeature selected photos"
 
@@ -99,8 +141,9 @@ class RewardAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at',)
     
     def total_likes_display(self, obj):
-        return obj.total_likes()
+        return obj.like_count
     total_likes_display.short_description = 'Likes'
+    total_likes_display.admin_order_field = 'like_count'
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
@@ -113,8 +156,9 @@ class DocumentAdmin(admin.ModelAdmin):
     actions = ['approve_documents']
     
     def total_likes_display(self, obj):
-        return obj.total_likes()
+        return obj.like_count
     total_likes_display.short_description = 'Likes'
+    total_likes_display.admin_order_field = 'like_count'
     
     def file_preview(self, obj):
         if obj.file:
@@ -123,7 +167,8 @@ class DocumentAdmin(admin.ModelAdmin):
     file_preview.short_description = 'File'
     
     def approve_documents(self, request, queryset):
-        updated = queryset.update(is_approved=True)
+        updated = queryset.update(is_approved=True, updated_at=timezone.now())
+        bump_versions(Document)
         self.message_user(request, f'{updated} documents approved.')
     approve_documents.short_description = "Approve selected documents"
 
@@ -178,4 +223,43 @@ class FeaturedPhotoAdmin(admin.ModelAdmin):
     list_display = ('photo', 'featured_from', 'featured_until', 'is_active')
     list_filter = ('is_active', 'featured_from')
     search_fields = ('photo__title',)
-    list_editable = ('is_active',)
\ No newline at end of file
+    list_editable = ('is_active',)
+
+@admin.register(JobRun)
+class JobRunAdmin(admin.ModelAdmin):
+    list_display = ('job', 'status', 'started_at', 'duration', 'host')
+    list_filter = ('job', 'status')
+    readonly_fields = ('job', 'status', 'started_at', 'finished_at', 'duration', 'output', 'host')
+    
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'args', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by')
+    list_filter = ('status', 'task')
+    readonly_fields = ('task', 'args', 'status', 'attempts', 'max_attempts', 'run_at',
+                       'locked_by', 'locked_at', 'last_error', 'created_at', 'updated_at')
+    actions = ['retry_now']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def retry_now(self, request, queryset):
+        updated = requeue(queryset)
+        self.message_user(request, f'{updated} jobs queued to run now.')
+    retry_now.short_description = 'Retry selected jobs now'
+
+@admin.register(DeadJob)
+class DeadJobAdmin(BackgroundJobAdmin):
+    list_display = ('task', 'args', 'attempts', 'updated_at', 'error_summary')
+    list_filter = ('task',)
+    ordering = ('-updated_at',)
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(status='dead')
+    
+    def error_summary(self, obj):
+        lines = obj.last_error.strip().splitlines()
+        return lines[-1] if lines else ''
+    error_summary.short_description = 'Error'
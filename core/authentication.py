@@ -0,0 +1,70 @@
+import copy
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .cache import TTLCache, register_cache
+
+user_cache = register_cache('jwt_users', TTLCache(
+    max_entries=getattr(settings, 'JWT_USER_CACHE_MAX_ENTRIES', 10000),
+    ttl=getattr(settings, 'JWT_USER_CACHE_TTL', 300),
+))
+
+
+def invalidate_users(user_ids):
+    """
+    Drop cached users, after writes that bypass ``post_save`` such as
+    ``QuerySet.update()``. Evicted again once the transaction commits, since
+    a request loading a user before then re-caches the old row.
+    """
+    user_ids = list(user_ids)
+
+    def evict():
+        for user_id in user_ids:
+            user_cache.delete(user_id)
+
+    evict()
+    transaction.on_commit(evict)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves the token's user from an in-process
+    TTL cache instead of loading the user row on every request.
+
+    Entries are dropped on ``User`` save/delete in this process only: other
+    worker processes keep serving their cached copy, role and flags included,
+    for up to ``JWT_USER_CACHE_TTL`` seconds (``is_active`` and password
+    changes too). Lower the TTL if that window matters.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+        else:
+            self.check_cached_user(validated_token, user)
+
+        # Hand each request its own instance so nothing leaks between requests
+        return copy.deepcopy(user)
+
+    def check_cached_user(self, validated_token, user):
+        # Same checks JWTAuthentication.get_user applies after its lookup
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code='password_changed'
+            )
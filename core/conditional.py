@@ -0,0 +1,107 @@
+import hashlib
+
+from django.db.models import Count, Max, Sum
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+
+def make_etag(*parts):
+    return '"{}"'.format(hashlib.md5(repr(parts).encode()).hexdigest())
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code != 200:
+        return response
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def response_validators(response):
+    return response.get('ETag'), parse_http_date_safe(response.get('Last-Modified'))
+
+
+def check_not_modified(request, etag, last_modified):
+    """
+    A 304 carrying the validators if the request's preconditions match, else None.
+    """
+    validators = set_validators(HttpResponse(), etag, last_modified)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=validators
+    )
+    return None if response is validators else response
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for ``list`` and ``retrieve``. Validators
+    come from one aggregate (or primary-key) query over the filtered rows, so
+    a matching ``If-None-Match`` / ``If-Modified-Since`` gets a 304 without
+    loading or serializing the payload.
+
+    Only the ETag covers deletions, counter changes and edits to
+    ``related_models`` (a renamed category or uploader): none of them move
+    ``Max(updated_at)``. Their versions from the response cache go into the
+    ETag. Lists therefore send no Last-Modified, and details only do when
+    they have neither counters nor related models, so an
+    ``If-Modified-Since`` alone can never produce a stale 304.
+    """
+    updated_field = 'updated_at'
+    counter_fields = ('like_count', 'comment_count')
+    related_models = ()
+
+    def request_fingerprint(self):
+        # response_cache builds on this module
+        from .response_cache import model_versions
+
+        request = self.request
+        params = sorted(
+            (name, tuple(sorted(values))) for name, values in request.query_params.lists()
+        )
+        # Payloads carry per-viewer fields such as ``user_has_liked``
+        fingerprint = (request.user.pk, request.accepted_renderer.format, tuple(params))
+        return fingerprint + model_versions(self.related_models)
+
+    def list_validators(self):
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        aggregates = {'updated': Max(self.updated_field), 'rows': Count('pk')}
+        for field in self.counter_fields:
+            aggregates[field] = Sum(field)
+        values = queryset.aggregate(**aggregates)
+        return make_etag(sorted(values.items()), self.request_fingerprint()), None
+
+    def detail_validators(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            values = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ).values_list(self.updated_field, *self.counter_fields).first()
+        except (TypeError, ValueError):
+            values = None
+        if values is None:
+            # Let the regular view produce its 404
+            return None, None
+        last_modified = None if self.counter_fields or self.related_models else int(values[0].timestamp())
+        return make_etag(values, self.request_fingerprint()), last_modified
+
+    def conditional_response(self, request, validators, view, *args, **kwargs):
+        etag, last_modified = validators
+        if etag is None:
+            return view(request, *args, **kwargs)
+        not_modified = check_not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(view(request, *args, **kwargs), etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, self.list_validators(), super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, self.detail_validators(), super().retrieve, *args, **kwargs
+        )
@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import FeaturedPhoto, Photo
+from .response_cache import bump_versions
+
+LIKE_THRESHOLD = getattr(settings, 'FEATURED_PHOTO_LIKE_THRESHOLD', 10)
+FEATURED_DAYS = getattr(settings, 'FEATURED_PHOTO_DAYS', 30)
+
+
+def expired_featured(now, window):
+    """
+    Active ``FeaturedPhoto`` rows past their end: ``featured_until`` when it
+    is set, otherwise ``window`` after ``featured_from``.
+    """
+    return FeaturedPhoto.objects.filter(is_active=True).filter(
+        Q(featured_until__lt=now) | Q(featured_until__isnull=True, featured_from__lt=now - window)
+    )
+
+
+def eligible_photos(threshold):
+    """
+    Approved photos at or over ``threshold`` likes that have never been
+    featured. A photo whose run ended keeps its inactive ``FeaturedPhoto``
+    row, so it is not promoted again on the next pass.
+    """
+    return Photo.objects.filter(
+        is_approved=True, is_featured=False, like_count__gte=threshold, featuredphoto__isnull=True
+    )
+
+
+def create_featured_rows(photo_ids, now, window, batch_size=1000):
+    FeaturedPhoto.objects.bulk_create(
+        [FeaturedPhoto(photo_id=pk, featured_until=now + window, is_active=True) for pk in photo_ids],
+        batch_size=batch_size, ignore_conflicts=True,
+    )
+
+
+def set_featured(photo_ids, featured, days=FEATURED_DAYS):
+    """
+    Bring ``FeaturedPhoto`` rows in line after ``is_featured`` was set on
+    ``photo_ids`` directly (admin actions, edits): start a run for newly
+    featured photos, end the run of unfeatured ones.
+    """
+    photo_ids = list(photo_ids)
+    if not photo_ids:
+        return
+    now = timezone.now()
+    window = timedelta(days=days)
+    with transaction.atomic():
+        if featured:
+            FeaturedPhoto.objects.filter(photo_id__in=photo_ids, is_active=False).update(
+                is_active=True, featured_from=now, featured_until=now + window
+            )
+            create_featured_rows(photo_ids, now, window)
+        else:
+            FeaturedPhoto.objects.filter(photo_id__in=photo_ids, is_active=True).update(is_active=False)
+    bump_versions(FeaturedPhoto)
+
+
+def promote(photo_id, threshold=LIKE_THRESHOLD, days=FEATURED_DAYS):
+    """
+    Feature ``photo_id`` if its ``like_count`` has reached ``threshold``. One
+    conditional UPDATE, which matches nothing once the photo is featured,
+    plus a single INSERT when it flips. Returns True if promoted.
+    """
+    with transaction.atomic():
+        if not eligible_photos(threshold).filter(pk=photo_id).update(is_featured=True, updated_at=timezone.now()):
+            return False
+        create_featured_rows([photo_id], timezone.now(), timedelta(days=days))
+    bump_versions(Photo, FeaturedPhoto)
+    return True
+
+
+def update_featured(threshold=LIKE_THRESHOLD, days=FEATURED_DAYS, dry_run=False, batch_size=1000):
+    """
+    Expire featured runs that are over, then feature every eligible photo,
+    with a handful of set-based statements in one transaction. Reads the
+    maintained ``like_count`` rather than counting likes per photo. Returns
+    ``{'expired': n, 'featured': n, 'repaired': n}``.
+    """
+    now = timezone.now()
+    window = timedelta(days=days)
+    expired = expired_featured(now, window)
+    eligible = eligible_photos(threshold)
+    # Photos featured by hand in the admin list, without an active run
+    orphaned = Photo.objects.filter(is_featured=True, featuredphoto__isnull=True)
+    lapsed = FeaturedPhoto.objects.filter(is_active=False, photo__is_featured=True)
+
+    if dry_run:
+        return {
+            'expired': expired.count(),
+            'featured': eligible.count(),
+            'repaired': orphaned.count() + lapsed.count(),
+        }
+
+    with transaction.atomic():
+        expired_ids = list(expired.values_list('photo_id', flat=True))
+        for start in range(0, len(expired_ids), batch_size):
+            chunk = expired_ids[start:start + batch_size]
+            Photo.objects.filter(pk__in=chunk).update(is_featured=False, updated_at=now)
+            FeaturedPhoto.objects.filter(photo_id__in=chunk).update(is_active=False)
+
+        repaired_ids = list(orphaned.values_list('pk', flat=True))
+        create_featured_rows(repaired_ids, now, window, batch_size)
+        repaired = len(repaired_ids) + lapsed.update(is_active=True, featured_from=now, featured_until=now + window)
+
+        featured_ids = list(eligible.values_list('pk', flat=True))
+        for start in range(0, len(featured_ids), batch_size):
+            chunk = featured_ids[start:start + batch_size]
+            Photo.objects.filter(pk__in=chunk, is_featured=False).update(is_featured=True, updated_at=now)
+            create_featured_rows(chunk, now, window, batch_size)
+
+    if expired_ids or featured_ids or repaired:
+        bump_versions(Photo, FeaturedPhoto)
+    return {'expired': len(expired_ids), 'featured': len(featured_ids), 'repaired': repaired}
@@ -0,0 +1,61 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+def _greatest(a, b):
+    # SQLite spells GREATEST as the multi-argument MAX scalar function
+    name = 'MAX' if connection.vendor == 'sqlite' else 'GREATEST'
+    return f'{name}({a}, {b})'
+
+
+def toggle_like(model, object_id, user_id):
+    """
+    Flip ``user_id``'s like on ``model`` row ``object_id`` and return
+    ``(liked, like_count)``, or ``(False, None)`` if the row does not exist.
+
+    The ``Like`` row is removed with ``DELETE ... RETURNING`` or created with
+    ``INSERT ... ON CONFLICT DO NOTHING``, and ``like_count`` is shifted in the
+    same transaction, so concurrent clicks never double count and nothing
+    is re-counted. Bypasses model signals; callers own any side effects.
+    """
+    from .models import Like
+
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    likes_table = qn(Like._meta.db_table)
+    content_type_id = ContentType.objects.get_for_model(model).id
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {likes_table} '
+            f'WHERE user_id = %s AND content_type_id = %s AND object_id = %s RETURNING 1',
+            [user_id, content_type_id, object_id]
+        )
+        if cursor.fetchone():
+            liked, delta = False, -1
+        else:
+            cursor.execute(
+                f'INSERT INTO {likes_table} (user_id, content_type_id, object_id, created_at) '
+                f'SELECT %s, %s, %s, %s WHERE EXISTS (SELECT 1 FROM {table} WHERE id = %s) '
+                f'ON CONFLICT (user_id, content_type_id, object_id) DO NOTHING RETURNING 1',
+                [user_id, content_type_id, object_id, timezone.now(), object_id]
+            )
+            # No row back means either a concurrent click already liked it, or
+            # the target is missing; the count lookup below tells them apart.
+            liked, delta = True, 1 if cursor.fetchone() else 0
+
+        if delta:
+            cursor.execute(
+                f'UPDATE {table} SET like_count = {_greatest("like_count + %s", "0")} '
+                f'WHERE id = %s RETURNING like_count',
+                [delta, object_id]
+            )
+        else:
+            cursor.execute(f'SELECT like_count FROM {table} WHERE id = %s', [object_id])
+        row = cursor.fetchone()
+
+    if row is None:
+        return False, None
+    return liked, row[0]
+
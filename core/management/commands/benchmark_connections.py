@@ -0,0 +1,97 @@
+import copy
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core.models import Photo
+
+MODES = {
+    'reconnect': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+    'pooled': {'ENGINE': 'backend.postgresql_pool', 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True},
+}
+
+
+def serve(alias, count, latencies):
+    """
+    ``count`` requests on one thread, with the connection handling Django
+    does around each request (``request_started``/``request_finished``)
+    and a typical feed query in between.
+    """
+    connection = connections[alias]
+    try:
+        for _ in range(count):
+            started = time.perf_counter()
+            connection.close_if_unusable_or_obsolete()
+            list(
+                Photo.objects.using(alias).filter(is_approved=True)
+                .order_by('-created_at').values_list('pk', 'title')[:20]
+            )
+            connection.close_if_unusable_or_obsolete()
+            latencies.append(time.perf_counter() - started)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request database latency with reconnects, persistent connections and the pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Number of request threads')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per thread')
+        parser.add_argument('--pool-size', type=int, default=None,
+                            help='Pool size for the pooled run (default: --concurrency)')
+        parser.add_argument('--database', default='default',
+                            help='Database alias whose settings are benchmarked')
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        base = connections[options['database']].settings_dict
+        results = {}
+        for mode, overrides in MODES.items():
+            if mode == 'pooled' and connections[options['database']].vendor != 'postgresql':
+                self.stdout.write(self.style.WARNING('pooled: skipped, the pool needs PostgreSQL'))
+                continue
+            alias = f'benchmark-{mode}'
+            settings_dict = {**copy.deepcopy(base), **overrides}
+            if mode == 'pooled':
+                settings_dict['OPTIONS']['pool_size'] = options['pool_size'] or concurrency
+            connections.settings[alias] = settings_dict
+            try:
+                results[mode] = self.run(mode, alias, concurrency, options['requests'])
+            finally:
+                del connections.settings[alias]
+                if mode == 'pooled':
+                    from backend.postgresql_pool.base import close_pools
+                    close_pools()
+
+        if 'reconnect' in results:
+            for mode in ('persistent', 'pooled'):
+                if mode in results:
+                    saved = results['reconnect'] - results[mode]
+                    self.stdout.write(self.style.SUCCESS(
+                        f'{mode}: saves {saved * 1000:.2f} ms per request (mean) over reconnecting'
+                    ))
+
+    def run(self, mode, alias, concurrency, count):
+        latencies = [[] for _ in range(concurrency)]
+        threads = [threading.Thread(target=serve, args=(alias, count, latencies[i])) for i in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        samples = [latency for thread_latencies in latencies for latency in thread_latencies]
+        mean = statistics.fmean(samples)
+        p95 = statistics.quantiles(samples, n=20)[18] if len(samples) > 1 else mean
+        self.stdout.write(
+            f'{mode:>10}: {len(samples)} requests in {elapsed:.2f}s ({len(samples) / elapsed:.0f}/s), '
+            f'mean {mean * 1000:.2f} ms, p50 {statistics.median(samples) * 1000:.2f} ms, p95 {p95 * 1000:.2f} ms'
+        )
+        return mean
@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.likes import toggle_like
+from core.models import User, Category, Photo
+
+
+def legacy_toggle(photo_id, user):
+    """
+    The per-view like flow the toggle replaced: load, check, add/remove,
+    count, then save the photo (firing post_save).
+    """
+    photo = Photo.objects.get(pk=photo_id)
+    existing = photo.likes.filter(user=user)
+    if existing.exists():
+        existing.delete()
+    else:
+        photo.likes.create(user=user)
+    if photo.likes.count() >= 10:
+        photo.is_featured = True
+        photo.save()
+    return photo.likes.count()
+
+
+class Command(BaseCommand):
+    help = 'Measure likes per second for the legacy like flow and the atomic toggle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000,
+                            help='Number of like clicks per run')
+        parser.add_argument('--users', type=int, default=50,
+                            help='Number of distinct users clicking')
+
+    def handle(self, *args, **options):
+        iterations, user_count = options['iterations'], options['users']
+
+        # Everything happens in one transaction that is rolled back at the end,
+        # so the benchmark leaves no fixtures or likes behind.
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username=f'bench-like-{i}', email=f'bench-like-{i}@example.invalid')
+                for i in range(user_count)
+            ])
+            category = Category.objects.create(name='bench-likes', created_by=users[0])
+            photo = Photo.objects.create(
+                title='bench', image='photos/bench.jpg', category=category,
+                uploaded_by=users[0], is_approved=True
+            )
+
+            results = {}
+            for label, click in (
+                ('legacy', lambda user: legacy_toggle(photo.pk, user)),
+                ('toggle', lambda user: toggle_like(Photo, photo.pk, user.pk)),
+            ):
+                photo.likes.all().delete()
+                Photo.objects.filter(pk=photo.pk).update(like_count=0)
+                started = time.perf_counter()
+                for i in range(iterations):
+                    click(users[i % user_count])
+                elapsed = time.perf_counter() - started
+                results[label] = iterations / elapsed
+                self.stdout.write(
+                    f'{label:>7}: {results[label]:10.1f} likes/s '
+                    f'({elapsed * 1000 / iterations:.3f} ms per like)'
+                )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'speedup: {results["toggle"] / results["legacy"]:.1f}x'
+        ))
@@ -0,0 +1,76 @@
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Q
+from core.managers import count_subquery
+from core.models import Photo, Reward, Document, Comment, Like
+from core.response_cache import bump_versions
+
+COUNTED_MODELS = (Photo, Reward, Document)
+
+
+def actual_counts(model):
+    """
+    Return subquery expressions computing the true like and comment totals
+    for each row of ``model``.
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    return {
+        'like_count': count_subquery(
+            Like.objects.filter(content_type=content_type, object_id=OuterRef('pk')),
+            'object_id'
+        ),
+        'comment_count': count_subquery(
+            Comment.objects.filter(content_type=content_type, object_id=OuterRef('pk')),
+            'object_id'
+        ),
+    }
+
+
+def reconcile_model(model, chunk_size=1000, dry_run=False):
+    """
+    Recompute the stored counters of ``model`` in primary-key chunks with one
+    set-based UPDATE per chunk. Returns ``(rows_scanned, rows_drifted)``.
+    """
+    last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    scanned = drifted = 0
+    for start in range(0, last_pk + 1, chunk_size):
+        chunk = model.objects.filter(pk__gte=start, pk__lt=start + chunk_size)
+        expressions = actual_counts(model)
+        stale = chunk.annotate(
+            actual_likes=expressions['like_count'],
+            actual_comments=expressions['comment_count'],
+        ).filter(~Q(like_count=F('actual_likes')) | ~Q(comment_count=F('actual_comments')))
+        stale_pks = list(stale.values_list('pk', flat=True))
+        scanned += chunk.count()
+        drifted += len(stale_pks)
+        if stale_pks and not dry_run:
+            with transaction.atomic():
+                model.objects.filter(pk__in=stale_pks).update(**actual_counts(model))
+    if drifted and not dry_run:
+        bump_versions(model)
+    return scanned, drifted
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized like and comment counters after drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of primary keys handled per UPDATE')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted rows without fixing them')
+
+    def handle(self, *args, **options):
+        for model in COUNTED_MODELS:
+            started = time.monotonic()
+            scanned, drifted = reconcile_model(
+                model, chunk_size=options['chunk_size'], dry_run=options['dry_run']
+            )
+            verb = 'would fix' if options['dry_run'] else 'fixed'
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: scanned {scanned}, {verb} {drifted} '
+                f'in {time.monotonic() - started:.2f}s'
+            ))
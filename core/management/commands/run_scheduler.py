@@ -0,0 +1,52 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.scheduler import Scheduler, configured_jobs, last_started, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run the periodic maintenance jobs from SCHEDULER_JOBS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Run whatever is due now, then exit')
+        parser.add_argument('--list', action='store_true',
+                            help='Show the configured jobs and their last run')
+        parser.add_argument('--run', metavar='JOB',
+                            help='Run one job immediately, regardless of its interval')
+
+    def handle(self, *args, **options):
+        jobs = configured_jobs()
+        if options['list']:
+            for job in jobs:
+                last = last_started(job.name)
+                self.stdout.write(f'{job.name}: every {job.every}, jitter {job.jitter}s, last run {last or "never"}')
+            return
+
+        if options['run']:
+            job = next((job for job in jobs if job.name == options['run']), None)
+            if job is None:
+                raise CommandError(f"Unknown job '{options['run']}'")
+            self.report(run_job(job, force=True), job.name)
+            return
+
+        scheduler = Scheduler(jobs)
+        if options['once']:
+            for run in scheduler.run_pending():
+                self.report(run, run.job)
+            return
+
+        signal.signal(signal.SIGTERM, scheduler.stop)
+        signal.signal(signal.SIGINT, scheduler.stop)
+        self.stdout.write(f'Scheduler started at {timezone.now():%Y-%m-%d %H:%M:%S} with {len(jobs)} jobs')
+        scheduler.run_forever(on_run=lambda run: self.report(run, run.job))
+        self.stdout.write('Scheduler stopped')
+
+    def report(self, run, name):
+        if run is None:
+            self.stdout.write(self.style.WARNING(f'{name}: skipped, another instance holds its lock'))
+        elif run.status == 'succeeded':
+            self.stdout.write(self.style.SUCCESS(f'{name}: succeeded in {run.duration:.2f}s'))
+        else:
+            self.stdout.write(self.style.ERROR(f'{name}: failed after {run.duration:.2f}s'))
@@ -0,0 +1,42 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+from core.models import BackgroundJob
+from core.tasks import WorkerPool
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs queued with core.tasks.enqueue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2,
+                            help='Number of worker threads')
+        parser.add_argument('--poll-interval', type=float, default=1,
+                            help='Seconds an idle worker waits before checking the queue again')
+        parser.add_argument('--burst', action='store_true',
+                            help='Run the jobs that are due, then exit')
+        parser.add_argument('--stats', action='store_true',
+                            help='Show queue depth by task and status, then exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            rows = BackgroundJob.objects.values('task', 'status').annotate(jobs=Count('pk')).order_by('task', 'status')
+            for row in rows:
+                self.stdout.write(f"{row['task']}: {row['jobs']} {row['status']}")
+            return
+
+        concurrency = max(1, options['concurrency'])
+        pool = WorkerPool(concurrency, options['poll_interval'], options['burst'])
+        if not options['burst']:
+            signal.signal(signal.SIGTERM, pool.stop)
+            signal.signal(signal.SIGINT, pool.stop)
+            self.stdout.write(f'{concurrency} workers started at {timezone.now():%Y-%m-%d %H:%M:%S}')
+
+        started = time.monotonic()
+        pool.run()
+        self.stdout.write(self.style.SUCCESS(
+            f'{pool.succeeded} jobs succeeded, {pool.failed} failed in {time.monotonic() - started:.2f}s'
+        ))
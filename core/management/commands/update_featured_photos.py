@@ -1,36 +1,26 @@
+import time
+
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from core.models import Photo, FeaturedPhoto
+from core.featuring import FEATURED_DAYS, LIKE_THRESHOLD, update_featured
 
 class Command(BaseCommand):
     help = 'Update featured photos based on likes and time criteria'
     
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=int, default=LIKE_THRESHOLD,
+                            help='Likes a photo needs to be featured')
+        parser.add_argument('--days', type=int, default=FEATURED_DAYS,
+                            help='How long a photo stays featured')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Count what would change without writing anything')
+    
     def handle(self, *args, **options):
-        # Feature photos with high likes
-        popular_photos = Photo.objects.filter(
-            likes__gte=10,
-            is_approved=True,
-            is_featured=False
-        )
-        
-        for photo in popular_photos:
-            photo.is_featured = True
-            photo.save()
-            self.stdout.write(
-                self.style.SUCCESS(f'Featured photo: {photo.title}')
-            )
-        
-        # Unfeature old featured photos (older than 30 days)
-        old_featured = FeaturedPhoto.objects.filter(
-            featured_from__lt=timezone.now() - timezone.timedelta(days=30),
-            is_active=True
+        started = time.monotonic()
+        result = update_featured(
+            threshold=options['threshold'], days=options['days'], dry_run=options['dry_run']
         )
-        
-        for featured in old_featured:
-            featured.is_active = False
-            featured.save()
-            featured.photo.is_featured = False
-            featured.photo.save()
-            self.stdout.write(
-                self.style.WARNING(f'Unfeatured old photo: {featured.photo.title}')
-            )
\ No newline at end of file
+        prefix = 'would have ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}featured {result['featured']} photos, expired {result['expired']}, "
+            f"repaired {result['repaired']} featured entries in {time.monotonic() - started:.2f}s"
+        ))
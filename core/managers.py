@@ -1,7 +1,40 @@
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.db.models import Count, Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
-class PhotoManager(models.Manager):
+
+def count_subquery(queryset, field):
+    """
+    Correlated COUNT(*) over ``queryset`` grouped by ``field``, so that
+    per-row counts can be computed without joining and regrouping the outer query.
+    """
+    counts = queryset.order_by().values(field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(counts, output_field=models.IntegerField()), Value(0))
+
+
+class EngagementQuerySet(models.QuerySet):
+    def with_engagement(self, user=None):
+        """
+        Annotate ``viewer_has_liked`` so serializers can read it instead of
+        querying once per row. Like and comment totals are stored on the row.
+        """
+        from .models import Like
+
+        if user is not None and user.is_authenticated:
+            viewer_has_liked = Exists(Like.objects.filter(
+                user=user.pk,
+                content_type=ContentType.objects.get_for_model(self.model),
+                object_id=OuterRef('pk'),
+            ))
+        else:
+            viewer_has_liked = Value(False, output_field=models.BooleanField())
+
+        return self.annotate(viewer_has_liked=viewer_has_liked)
+
+
+class PhotoManager(models.Manager.from_queryset(EngagementQuerySet)):
     def featured(self):
         return self.get_queryset().filter(is_featured=True, is_approved=True)
     
@@ -14,7 +47,10 @@ class PhotoManager(models.Manager):
             is_approved=True
         )
 
-class DocumentManager(models.Manager):
+class RewardManager(models.Manager.from_queryset(EngagementQuerySet)):
+    pass
+
+class DocumentManager(models.Manager.from_queryset(EngagementQuerySet)):
     def by_type(self, doc_type):
         return self.get_queryset().filter(document_type=doc_type, is_approved=True)
     
@@ -22,4 +58,4 @@ class DocumentManager(models.Manager):
         return self.get_queryset().filter(
             created_at__gte=timezone.now() - timezone.timedelta(days=days),
             is_approved=True
-        )
\ No newline at end of file
+        )
@@ -1,3 +1,17 @@
+from django.utils.functional import SimpleLazyObject, empty
+from .activity import activity_buffer
+
+
+def _resolved_user(request):
+    """
+    Return the request's user only if something already loaded it, so that
+    activity tracking never costs a session or user lookup by itself.
+    """
+    user = getattr(request, 'user', None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return user
+
 class UserActivityMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -5,9 +19,10 @@ class UserActivityMiddleware:
     def __call__(self, request):
         response = self.get_response(request)
         
-        # Track user activity if user is authenticated
-        if request.user.is_authenticated:
-           # request.user.last_activity = timezone.now()
-            request.user.save(update_fields=['last_activity'])
+        # Track user activity if user is authenticated; writes are sampled per
+        # user and flushed in bulk by the activity buffer
+        user = _resolved_user(request)
+        if user is not None and user.is_authenticated:
+            activity_buffer.record(user.pk)
         
-        return response
\ No newline at end of file
+        return response
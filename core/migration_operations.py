@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class PostgresOnlyMixin:
+    """
+    Apply the wrapped operation's schema change only on PostgreSQL, while
+    always recording it in the migration state. Lets PostgreSQL-specific
+    indexes live on the models without breaking SQLite test databases.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class PostgresOnlyAddIndex(PostgresOnlyMixin, migrations.AddIndex):
+    pass
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:26
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, field):
+    counts = queryset.order_by().values(field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(counts, output_field=models.IntegerField()), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Comment = apps.get_model('core', 'Comment')
+    for model_name in ('photo', 'reward', 'document'):
+        model = apps.get_model('core', model_name)
+        content_type = ContentType.objects.filter(app_label='core', model=model_name).first()
+        comments = Comment.objects.filter(content_type=content_type, object_id=OuterRef('pk'))
+        model.objects.update(
+            like_count=_count(model.likes.through.objects.filter(**{model_name: OuterRef('pk')}), model_name),
+            comment_count=_count(comments, 'object_id'),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_remove_reward_photo_reward_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reward',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reward',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+LIKEABLE_MODELS = ('photo', 'reward', 'document')
+BATCH_SIZE = 5000
+
+
+def copy_m2m_likes(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Like = apps.get_model('core', 'Like')
+    for model_name in LIKEABLE_MODELS:
+        model = apps.get_model('core', model_name)
+        content_type, _ = ContentType.objects.get_or_create(app_label='core', model=model_name)
+        rows = model.likes.through.objects.values_list(f'{model_name}_id', 'user_id').iterator()
+        batch = []
+        for object_id, user_id in rows:
+            batch.append(Like(user_id=user_id, content_type=content_type, object_id=object_id))
+            if len(batch) >= BATCH_SIZE:
+                Like.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        Like.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def restore_m2m_likes(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Like = apps.get_model('core', 'Like')
+    for model_name in LIKEABLE_MODELS:
+        model = apps.get_model('core', model_name)
+        through = model.likes.through
+        content_type = ContentType.objects.filter(app_label='core', model=model_name).first()
+        rows = Like.objects.filter(content_type=content_type).values_list('object_id', 'user_id').iterator()
+        batch = []
+        for object_id, user_id in rows:
+            batch.append(through(**{f'{model_name}_id': object_id, 'user_id': user_id}))
+            if len(batch) >= BATCH_SIZE:
+                through.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        through.objects.bulk_create(batch, ignore_conflicts=True)
+        Like.objects.filter(content_type=content_type).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0003_engagement_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['content_type', 'object_id'], name='core_like_target_idx'),
+        ),
+        migrations.RunPython(copy_m2m_likes, restore_m2m_likes),
+        migrations.RemoveField(
+            model_name='document',
+            name='likes',
+        ),
+        migrations.RemoveField(
+            model_name='photo',
+            name='likes',
+        ),
+        migrations.RemoveField(
+            model_name='reward',
+            name='likes',
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:32
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from core.migration_operations import PostgresOnlyAddIndex
+
+SEARCH_FIELDS = {
+    'photo': (('title', 'A'), ('description', 'B')),
+    'reward': (('student_name', 'A'), ('achievement', 'B')),
+    'document': (('title', 'A'), ('description', 'B')),
+}
+
+
+def backfill_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, fields in SEARCH_FIELDS.items():
+        vector = None
+        for name, weight in fields:
+            part = SearchVector(name, weight=weight, config='english')
+            vector = part if vector is None else vector + part
+        apps.get_model('core', model_name).objects.update(search_vector=vector)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='reward',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='document',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_document_search_idx'),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='photo',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_photo_search_idx'),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='reward',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_reward_search_idx'),
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+    ]
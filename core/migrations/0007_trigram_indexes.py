@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:33
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+from core.migration_operations import PostgresOnlyAddIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_full_text_search'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        PostgresOnlyAddIndex(
+            model_name='category',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='core_category_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='document',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='core_document_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='photo',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='core_photo_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='reward',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['student_name'], name='core_reward_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:37
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_reward_updated_at(apps, schema_editor):
+    # Creation time is the best available value for rows that predate the column
+    Reward = apps.get_model('core', 'Reward')
+    Reward.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reward',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_reward_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['is_approved', 'updated_at'], include=('like_count', 'comment_count'), name='core_document_validator_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['is_approved', 'updated_at'], include=('like_count', 'comment_count'), name='core_photo_validator_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reward',
+            index=models.Index(fields=['updated_at'], include=('like_count', 'comment_count'), name='core_reward_validator_idx'),
+        ),
+    ]
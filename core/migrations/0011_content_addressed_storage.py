@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:44
+
+import django.core.validators
+from django.db import migrations, models
+import media.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_image_metadata'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='file',
+            field=models.FileField(storage=media.storage.get_content_addressed_storage, upload_to='documents/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'ppt', 'pptx'])]),
+        ),
+        migrations.AlterField(
+            model_name='photo',
+            name='image',
+            field=models.ImageField(storage=media.storage.get_content_addressed_storage, upload_to='photos/'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='perceptual_hash',
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='reward',
+            name='perceptual_hash',
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+    ]
@@ -1,8 +1,13 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import FileExtensionValidator
-from .managers import PhotoManager, DocumentManager
+from django.utils import timezone
+from .managers import PhotoManager, RewardManager, DocumentManager
 from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from media.paths import ShardedUploadTo
+from media.storage import get_content_addressed_storage
 
 class User(AbstractUser):
     USER_TYPE_CHOICES = (
@@ -39,11 +44,64 @@ class Category(models.Model):
     
     class Meta:
         verbose_name_plural = "Categories"
+        indexes = [
+            GinIndex(fields=['name'], name='core_category_name_trgm', opclasses=['gin_trgm_ops']),
+        ]
     
     def __str__(self):
         return self.name
 
-class Photo(models.Model):
+class EngagementCounters(models.Model):
+    """
+    Denormalized like and comment totals. They are only ever changed through
+    ``F()`` updates, so ``save()`` leaves them out of the UPDATE rather than
+    writing back whatever value was loaded with the instance.
+    """
+    COUNTER_FIELDS = ('like_count', 'comment_count')
+    
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        abstract = True
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            skipped = set(self.COUNTER_FIELDS) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped and field.name not in skipped
+            ]
+        super().save(*args, **kwargs)
+    
+    def total_likes(self):
+        return self.like_count
+
+class ProcessedImage(models.Model):
+    """
+    What the media pipeline derives from ``image`` after upload: resized
+    renditions plus the dimensions, size, dominant color and placeholder
+    clients need before the image itself loads. Written in bulk by
+    ``media.renditions.save_processed``; a save racing it only causes the
+    image to be processed again.
+    """
+    PROCESSED_FIELDS = (
+        'renditions', 'image_width', 'image_height', 'image_bytes', 'dominant_color',
+        'placeholder', 'perceptual_hash',
+    )
+    
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_bytes = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    dominant_color = models.CharField(max_length=7, blank=True, editable=False)
+    placeholder = models.TextField(blank=True, editable=False)
+    perceptual_hash = models.CharField(max_length=16, blank=True, editable=False)
+    
+    class Meta:
+        abstract = True
+
+class Photo(EngagementCounters, ProcessedImage):
     PHOTO_TYPE_CHOICES = (
         ('celebration', 'Celebration'),
         ('general', 'General'),
@@ -52,43 +110,63 @@ class Photo(models.Model):
     
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
-    image = models.ImageField(upload_to='photos/')
+    image = models.ImageField(upload_to='photos/', storage=get_content_addressed_storage)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     photo_type = models.CharField(max_length=20, choices=PHOTO_TYPE_CHOICES, default='general')
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
-    likes = models.ManyToManyField(User, related_name='photo_likes', blank=True)
+    likes = GenericRelation('Like')
     is_featured = models.BooleanField(default=False)
     is_approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
    
     
     objects = PhotoManager()
     
-    def total_likes(self):
-        return self.likes.count()
-    
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='core_photo_feed_idx'),
+            models.Index(
+                fields=['is_approved', 'updated_at'], include=['like_count', 'comment_count'],
+                name='core_photo_validator_idx',
+            ),
+            GinIndex(fields=['search_vector'], name='core_photo_search_idx'),
+            GinIndex(fields=['title'], name='core_photo_title_trgm', opclasses=['gin_trgm_ops']),
+        ]
     
     def __str__(self):
         return self.title
 
-class Reward(models.Model):
+class Reward(EngagementCounters, ProcessedImage):
     student_name = models.CharField(max_length=200)
     student_department = models.CharField(max_length=100)
     student_batch = models.CharField(max_length=10)
     achievement = models.TextField()
-    image = models.ImageField(upload_to='rewards/', blank=True, null=True)  
+    image = models.ImageField(upload_to=ShardedUploadTo('rewards'), blank=True, null=True)  
     awarded_by = models.ForeignKey(User, on_delete=models.CASCADE)
-    likes = models.ManyToManyField(User, related_name='reward_likes', blank=True)
+    likes = GenericRelation('Like')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
     
-    def total_likes(self):
-        return self.likes.count()
+    objects = RewardManager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='core_reward_feed_idx'),
+            models.Index(
+                fields=['updated_at'], include=['like_count', 'comment_count'],
+                name='core_reward_validator_idx',
+            ),
+            GinIndex(fields=['search_vector'], name='core_reward_search_idx'),
+            GinIndex(fields=['student_name'], name='core_reward_name_trgm', opclasses=['gin_trgm_ops']),
+        ]
     
     def __str__(self):
         return f"{self.student_name} - {self.achievement[:50]}"
 
-class Document(models.Model):
+class Document(EngagementCounters):
     DOCUMENT_TYPE_CHOICES = (
         ('exam', 'Exam Paper'),
         ('research', 'Research Paper'),
@@ -101,18 +179,28 @@ class Document(models.Model):
     document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPE_CHOICES)
     file = models.FileField(
         upload_to='documents/',
+        storage=get_content_addressed_storage,
         validators=[FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'ppt', 'pptx'])]
     )
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
-    likes = models.ManyToManyField(User, related_name='document_likes', blank=True)
+    likes = GenericRelation('Like')
     is_approved = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     objects = DocumentManager()
     
-    def total_likes(self):
-        return self.likes.count()
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='core_document_feed_idx'),
+            models.Index(
+                fields=['is_approved', 'updated_at'], include=['like_count', 'comment_count'],
+                name='core_document_validator_idx',
+            ),
+            GinIndex(fields=['search_vector'], name='core_document_search_idx'),
+            GinIndex(fields=['title'], name='core_document_title_trgm', opclasses=['gin_trgm_ops']),
+        ]
     
     def __str__(self):
         return self.title
@@ -127,6 +215,11 @@ class Comment(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='core_comment_feed_idx'),
+            # Per-object comment threads are filtered by target, then paged by time
+            models.Index(fields=['content_type', 'object_id', 'created_at'], name='core_comment_target_idx'),
+        ]
     
     def __str__(self):
         return f"Comment by {self.user} on {self.created_at}"
@@ -137,6 +230,11 @@ class Comment(models.Model):
         return self.content_type.get_object_for_this_type(id=self.object_id)
 
 class Like(models.Model):
+    """
+    Single reaction store for photos, rewards and documents. The unique
+    ``(user, content_type, object_id)`` index answers "has the viewer liked
+    these ids" from the index alone; ``(content_type, object_id)`` serves likers.
+    """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -146,6 +244,9 @@ class Like(models.Model):
     
     class Meta:
         unique_together = ['user', 'content_type', 'object_id']
+        indexes = [
+            models.Index(fields=['content_type', 'object_id'], name='core_like_target_idx'),
+        ]
     
     def __str__(self):
         return f"Like by {self.user}"
@@ -175,4 +276,88 @@ class FeaturedPhoto(models.Model):
     is_active = models.BooleanField(default=True)
     
     def __str__(self):
-        return f"Featured: {self.photo.title}"
\ No newline at end of file
+        return f"Featured: {self.photo.title}"
+
+
+class JobRun(models.Model):
+    """
+    One execution of a scheduled maintenance job, kept for the admin and for
+    working out when the job is next due after a restart.
+    """
+    STATUS_CHOICES = (
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+    
+    job = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True)  # seconds
+    output = models.TextField(blank=True)
+    host = models.CharField(max_length=255, blank=True)
+    
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['job', 'started_at'], name='core_jobrun_job_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.job} at {self.started_at} ({self.status})"
+
+
+class JobLock(models.Model):
+    """
+    Lease-style lock for databases without advisory locks: a job may run
+    while its row names the caller as owner and ``expires_at`` is ahead.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    owner = models.CharField(max_length=255)
+    expires_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.name} held by {self.owner}"
+
+
+class BackgroundJob(models.Model):
+    """
+    A unit of deferred work from ``core.tasks``, claimed by ``run_workers``.
+    Succeeded jobs are deleted; jobs out of attempts stay behind as ``dead``.
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('dead', 'Dead'),
+    )
+    
+    task = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['run_at']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='core_backgroundjob_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.task}{tuple(self.args)} ({self.status})"
+
+
+class DeadJob(BackgroundJob):
+    """
+    Dead-letter view of ``BackgroundJob`` for the admin
+    """
+    class Meta:
+        proxy = True
+        verbose_name = 'dead job'
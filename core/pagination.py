@@ -0,0 +1,155 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Row count from the PostgreSQL planner's statistics instead of COUNT(*).
+    Other databases get an exact count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque cursor pagination on ``(created_at, id)``, newest first. Each page is
+    an index range scan on the composite index; there is no OFFSET and no COUNT.
+    Any other ``?ordering=`` is rejected with a 400 rather than ignored.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    supported_orderings = ('', '-created_at', '-created_at,-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = request.query_params.get(api_settings.ORDERING_PARAM, '').replace(' ', '')
+        if ordering not in self.supported_orderings:
+            raise ValidationError({
+                api_settings.ORDERING_PARAM: 'Cursor pagination only supports the default newest-first '
+                                             'ordering; use page numbers for other orderings.'
+            })
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        position = self.decode_cursor(request)
+        self.reverse = position is not None and position[2]
+
+        if position is None:
+            page = queryset.order_by('-created_at', '-id')
+        elif self.reverse:
+            created_at, pk, _ = position
+            page = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            ).order_by('created_at', 'id')
+        else:
+            created_at, pk, _ = position
+            page = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            ).order_by('-created_at', '-id')
+
+        results = list(page[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = results
+        return results
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            return datetime.fromisoformat(data['t']), int(data['i']), bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, instance, reverse=False):
+        data = {'t': instance.created_at.isoformat(), 'i': instance.pk}
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(data).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class FeedPagination(PageNumberPagination):
+    """
+    Page-number pagination for existing clients, with per-request opt-ins:
+
+    * ``?pagination=cursor`` (or any ``?cursor=``) switches to keyset pages
+    * ``?count=estimate`` reports the planner's row estimate instead of COUNT(*)
+    """
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.estimate = request.query_params.get(self.count_query_param) == 'estimate'
+        self.keyset = None
+        if (request.query_params.get(self.mode_query_param) == 'cursor'
+                or KeysetPagination.cursor_query_param in request.query_params):
+            self.keyset = KeysetPagination()
+            if self.estimate:
+                self.estimated_count = estimate_count(queryset)
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        if self.estimate:
+            self.django_paginator_class = EstimatedCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            response = self.keyset.get_paginated_response(data)
+            if self.estimate:
+                response.data = {'count': self.estimated_count, **response.data}
+        else:
+            response = super().get_paginated_response(data)
+        if self.estimate:
+            response.data['count_is_estimate'] = True
+        return response
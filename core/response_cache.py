@@ -0,0 +1,133 @@
+import functools
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+from .cache import TTLCache, register_cache
+from .conditional import check_not_modified, response_validators, set_validators
+
+VERSION_KEY = 'response-cache:version:{}'
+RESPONSE_KEY = 'response-cache:{}'
+
+
+class DjangoCacheBackend:
+    """
+    Stores cached responses in a shared Django cache (e.g. Redis or Memcached)
+    so every worker process sees the same entries. Eviction is left to the
+    cache server; hits and misses are counted per process.
+    """
+
+    def __init__(self, alias, ttl):
+        self.alias = alias
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _key(self, key):
+        return RESPONSE_KEY.format(hashlib.md5(repr(key).encode()).hexdigest())
+
+    def get(self, key, default=None):
+        value = caches[self.alias].get(self._key(key))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return default if value is None else value
+
+    def set(self, key, value):
+        caches[self.alias].set(self._key(key), value, self.ttl)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': self.alias, 'ttl': self.ttl, 'hits': self.hits, 'misses': self.misses}
+
+
+def _build_backend():
+    backend = getattr(settings, 'RESPONSE_CACHE_BACKEND', 'local')
+    ttl = getattr(settings, 'RESPONSE_CACHE_TTL', 60)
+    if backend == 'local':
+        return TTLCache(
+            max_entries=getattr(settings, 'RESPONSE_CACHE_MAX_ENTRIES', 500), ttl=ttl
+        )
+    return DjangoCacheBackend(backend, ttl)
+
+
+response_cache = register_cache('responses', _build_backend())
+
+
+def _version_store():
+    return caches[getattr(settings, 'RESPONSE_CACHE_VERSION_ALIAS', 'default')]
+
+
+def model_versions(models):
+    store = _version_store()
+    keys = [VERSION_KEY.format(model._meta.label_lower) for model in models]
+    versions = store.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # add() so a concurrent bump is not overwritten
+            store.add(key, 1, None)
+            versions[key] = store.get(key, 1)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_versions(*models):
+    """
+    Invalidate every cached response that depends on ``models``. Called from
+    model signals, and explicitly after writes that bypass them such as
+    ``QuerySet.update()`` or the raw ``like`` toggle.
+    """
+    store = _version_store()
+    for model in models:
+        key = VERSION_KEY.format(model._meta.label_lower)
+        try:
+            store.incr(key)
+        except ValueError:
+            store.set(key, 2, None)
+
+
+def response_key(request, models):
+    params = sorted(
+        (name, tuple(sorted(values))) for name, values in request.query_params.lists()
+    )
+    return (
+        request.scheme, request.get_host(), request.path, tuple(params), model_versions(models)
+    )
+
+
+def cache_anonymous_response(*models):
+    """
+    Serve anonymous GET requests to a list action from the response cache.
+
+    Entries are keyed by scheme and host (payloads hold absolute URLs),
+    path, normalized query params and the current version of each model in
+    ``models``, so any write to one of them makes older entries
+    unreachable. Validators set by the view are cached along with the
+    payload, so conditional requests can still get a 304 on a hit.
+    Authenticated requests are never cached, as their payloads differ per
+    viewer.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.user.is_authenticated:
+                return method(self, request, *args, **kwargs)
+
+            key = response_key(request, models)
+            cached = response_cache.get(key)
+            if cached is not None:
+                data, (etag, last_modified) = cached
+                not_modified = check_not_modified(request, etag, last_modified)
+                if not_modified is not None:
+                    return not_modified
+                return set_validators(Response(data), etag, last_modified)
+
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                response_cache.set(key, (response.data, response_validators(response)))
+            return response
+        return wrapper
+    return decorator
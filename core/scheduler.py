@@ -0,0 +1,184 @@
+import hashlib
+import io
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from .models import JobLock, JobRun
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DAYS = getattr(settings, 'SCHEDULER_HISTORY_DAYS', 30)
+OUTPUT_LIMIT = 10000
+HOST = f'{socket.gethostname()}:{os.getpid()}'
+
+
+class Job:
+    """
+    A management command run every ``every`` seconds, plus up to ``jitter``
+    seconds of random delay so instances and jobs do not fire in lockstep.
+    ``timeout`` bounds how long the lock-table fallback holds its lease.
+    """
+
+    def __init__(self, name, every, jitter=0, timeout=None, options=None, command=None):
+        self.name = name
+        self.command = command or name
+        self.every = timedelta(seconds=every)
+        self.jitter = jitter
+        self.timeout = timedelta(seconds=timeout or max(every, 60 * 60))
+        self.options = options or {}
+
+    def __repr__(self):
+        return f'<Job {self.name} every {self.every}>'
+
+
+def configured_jobs():
+    return [Job(name, **config) for name, config in getattr(settings, 'SCHEDULER_JOBS', {}).items()]
+
+
+def advisory_key(name):
+    # pg advisory locks take a signed 64-bit key
+    return int.from_bytes(hashlib.sha256(f'scheduler:{name}'.encode()).digest()[:8], 'big', signed=True)
+
+
+@contextmanager
+def job_lock(name, timeout):
+    """
+    Yield True if this process may run ``name`` now. Postgres uses a session
+    advisory lock, released when the block exits or the connection drops;
+    other databases lease a ``JobLock`` row that expires after ``timeout``.
+    """
+    if connection.vendor == 'postgresql':
+        key = advisory_key(name)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [key])
+            acquired = cursor.fetchone()[0]
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT pg_advisory_unlock(%s)', [key])
+                except DatabaseError:
+                    # Connection already gone, and the lock with it
+                    pass
+        return
+
+    owner = f'{HOST}:{uuid.uuid4().hex[:8]}'
+    now = timezone.now()
+    acquired = bool(JobLock.objects.filter(name=name, expires_at__lt=now).update(
+        owner=owner, expires_at=now + timeout
+    ))
+    if not acquired:
+        try:
+            with transaction.atomic():
+                JobLock.objects.create(name=name, owner=owner, expires_at=now + timeout)
+            acquired = True
+        except IntegrityError:
+            pass
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            JobLock.objects.filter(name=name, owner=owner).update(expires_at=timezone.now())
+
+
+def last_started(name):
+    return JobRun.objects.filter(job=name).aggregate(last=Max('started_at'))['last']
+
+
+def run_job(job, force=False):
+    """
+    Run ``job`` unless another instance holds its lock or, without
+    ``force``, already ran it within the interval. Returns the ``JobRun``
+    or None when skipped.
+    """
+    with job_lock(job.name, job.timeout) as acquired:
+        if not acquired:
+            return None
+        last = last_started(job.name)
+        now = timezone.now()
+        if not force and last is not None and last + job.every > now:
+            return None
+
+        run = JobRun.objects.create(job=job.name, started_at=now, host=HOST)
+        output = io.StringIO()
+        started = time.monotonic()
+        try:
+            call_command(job.command, stdout=output, stderr=output, **job.options)
+            run.status = 'succeeded'
+        except Exception:
+            logger.exception('Scheduled job %s failed', job.name)
+            output.write(traceback.format_exc())
+            run.status = 'failed'
+        run.finished_at = timezone.now()
+        run.duration = time.monotonic() - started
+        run.output = output.getvalue()[-OUTPUT_LIMIT:]
+        run.save(update_fields=['status', 'finished_at', 'duration', 'output'])
+
+    JobRun.objects.filter(job=job.name, started_at__lt=now - timedelta(days=HISTORY_DAYS)).delete()
+    return run
+
+
+class Scheduler:
+    """
+    Runs each job when due, in one thread, sleeping until the next due time.
+    Due times derive from run history, so restarts and extra instances do
+    not re-run jobs early.
+    """
+
+    def __init__(self, jobs, max_sleep=60):
+        self.jobs = list(jobs)
+        self.max_sleep = max_sleep
+        self.due = {}
+        self.stopping = threading.Event()
+
+    def next_due(self, job):
+        last = last_started(job.name)
+        if last is None:
+            # Never ran anywhere: due straight away
+            return timezone.now()
+        return last + job.every + timedelta(seconds=random.uniform(0, job.jitter))
+
+    def run_pending(self):
+        ran = []
+        for job in self.jobs:
+            if job.name not in self.due:
+                self.due[job.name] = self.next_due(job)
+            if self.stopping.is_set() or self.due[job.name] > timezone.now():
+                continue
+            run = run_job(job)
+            if run is not None:
+                ran.append(run)
+            self.due[job.name] = self.next_due(job)
+        return ran
+
+    def run_forever(self, on_run=None):
+        while not self.stopping.is_set():
+            close_old_connections()
+            try:
+                for run in self.run_pending():
+                    if on_run is not None:
+                        on_run(run)
+            except DatabaseError:
+                # Database restarting or unreachable: drop the connection and retry later
+                logger.exception('Scheduler pass failed')
+                connection.close()
+            wait = min(self.due.values(), default=timezone.now()) - timezone.now()
+            self.stopping.wait(min(max(wait.total_seconds(), 1), self.max_sleep))
+
+    def stop(self, *args):
+        self.stopping.set()
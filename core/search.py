@@ -0,0 +1,166 @@
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+)
+from django.db import connections
+from django.db.models import Case, F, FloatField, Lookup, Q, Value, When
+from .cache import TTLCache, register_cache
+from .models import Category, Photo, Reward, Document
+
+SEARCH_CONFIG = getattr(settings, 'SEARCH_CONFIG', 'english')
+
+# Searchable columns per model with their tsvector weights
+SEARCH_FIELDS = {
+    Photo: (('title', 'A'), ('description', 'B')),
+    Reward: (('student_name', 'A'), ('achievement', 'B')),
+    Document: (('title', 'A'), ('description', 'B')),
+}
+
+# Typeahead sources: (kind, model, text field, extra filters)
+SUGGEST_SOURCES = (
+    ('photo', Photo, 'title', {'is_approved': True}),
+    ('document', Document, 'title', {'is_approved': True}),
+    ('reward', Reward, 'student_name', {}),
+    ('category', Category, 'name', {}),
+)
+SUGGEST_MIN_LENGTH = 2
+
+suggest_cache = register_cache('search_suggest', TTLCache(
+    max_entries=getattr(settings, 'SEARCH_SUGGEST_CACHE_MAX_ENTRIES', 2000),
+    ttl=getattr(settings, 'SEARCH_SUGGEST_CACHE_TTL', 30),
+))
+
+
+def search_vector_expression(model):
+    fields = SEARCH_FIELDS[model]
+    vector = SearchVector(fields[0][0], weight=fields[0][1], config=SEARCH_CONFIG)
+    for name, weight in fields[1:]:
+        vector = vector + SearchVector(name, weight=weight, config=SEARCH_CONFIG)
+    return vector
+
+
+def uses_postgres(model):
+    return connections[model.objects.db].vendor == 'postgresql'
+
+
+def update_search_vector(model, pks=None):
+    """
+    Recompute the stored ``search_vector`` for ``pks`` (or every row). No-op
+    outside PostgreSQL, where the fallback backend does not read the column.
+    """
+    if not uses_postgres(model):
+        return 0
+    queryset = model.objects.all() if pks is None else model.objects.filter(pk__in=pks)
+    return queryset.update(search_vector=search_vector_expression(model))
+
+
+class PostgresSearchBackend:
+    """
+    Full-text search over the GIN-indexed ``search_vector`` columns, ranked
+    by ``ts_rank`` with title-like fields weighted above descriptions.
+    """
+
+    def search(self, queryset, query):
+        if not query:
+            return queryset.order_by('-created_at', '-id')
+        search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-created_at', '-id')
+
+
+class SimpleSearchBackend:
+    """
+    Database-agnostic fallback (SQLite in tests and local development):
+    case-insensitive substring match over the same fields, newest first.
+    """
+
+    def search(self, queryset, query):
+        if query:
+            condition = Q()
+            for name, _ in SEARCH_FIELDS[queryset.model]:
+                condition |= Q(**{f'{name}__icontains': query})
+            queryset = queryset.filter(condition)
+        return queryset.order_by('-created_at', '-id')
+
+
+def get_search_backend(model):
+    backend = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if backend == 'postgres' or (backend == 'auto' and uses_postgres(model)):
+        return PostgresSearchBackend()
+    return SimpleSearchBackend()
+
+
+class PrefixILike(Lookup):
+    """
+    ``field ILIKE 'query%'`` on the bare column. Django's ``istartswith``
+    wraps both sides in UPPER(), which a trigram index on the column cannot
+    serve.
+    """
+    lookup_name = 'prefix_ilike'
+
+    def __init__(self, lhs, prefix):
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        super().__init__(lhs, Value(escaped + '%'))
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', [*lhs_params, *rhs_params]
+
+
+def _suggest_queryset(kind, model, field, filters, query, fuzzy):
+    if fuzzy:
+        # ILIKE and % on the bare column are both served by its gin_trgm_ops index
+        prefix = Q(PrefixILike(F(field), query))
+        condition = prefix | Q(**{f'{field}__trigram_similar': query})
+        fallback = TrigramSimilarity(field, query)
+    else:
+        prefix = Q(**{f'{field}__istartswith': query})
+        condition = prefix | Q(**{f'{field}__icontains': query})
+        fallback = Value(0.5)
+    return model.objects.filter(condition, **filters).annotate(
+        kind=Value(kind),
+        text=F(field),
+        score=Case(When(prefix, then=Value(1.0)), default=fallback, output_field=FloatField()),
+    ).values('kind', 'id', 'text', 'score')
+
+
+def suggest(query, limit=8):
+    """
+    Top ``limit`` prefix matches (then fuzzy trigram matches on PostgreSQL)
+    across photo and document titles, student names and categories, fetched
+    with a single UNION query where the database allows it. Short-lived
+    results are cached per prefix.
+    """
+    query = ' '.join(query.split()).lower()
+    if len(query) < SUGGEST_MIN_LENGTH:
+        return []
+
+    cache_key = (query, limit)
+    cached = suggest_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    fuzzy = uses_postgres(Photo)
+    querysets = [
+        _suggest_queryset(kind, model, field, filters, query, fuzzy).order_by('-score')[:limit]
+        for kind, model, field, filters in SUGGEST_SOURCES
+    ]
+    if connections[Photo.objects.db].features.supports_slicing_ordering_in_compound:
+        rows = list(querysets[0].union(*querysets[1:], all=True))
+    else:
+        rows = [row for queryset in querysets for row in queryset]
+
+    suggestions, seen = [], set()
+    for row in sorted(rows, key=lambda row: (-row['score'], len(row['text']))):
+        key = (row['kind'], row['text'].lower())
+        if key in seen:
+            continue
+        seen.add(key)
+        suggestions.append({'type': row['kind'], 'id': row['id'], 'text': row['text']})
+        if len(suggestions) == limit:
+            break
+
+    suggest_cache.set(cache_key, suggestions)
+    return suggestions
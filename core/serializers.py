@@ -1,6 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from media.models import Upload
+from media.renditions import srcset
+from media.uploads import MAX_SIZE as MAX_UPLOAD_SIZE
 from .models import (
     User, Category, Photo, Reward, Document, 
     Comment, Like, RepresentativeRequest, FeaturedPhoto
@@ -60,80 +65,103 @@ class CategorySerializer(serializers.ModelSerializer):
                  'created_by', 'created_by_name', 'created_at']
         read_only_fields = ['id', 'created_by', 'created_at']
 
-class PhotoSerializer(serializers.ModelSerializer):
+class EngagementFieldsMixin:
+    """
+    Read ``total_likes`` and ``comments_count`` from the stored counters and
+    ``user_has_liked`` from the annotation added by
+    ``EngagementQuerySet.with_engagement``, falling back to a query for
+    instances that were not loaded through it.
+    """
+    def get_total_likes(self, obj):
+        return obj.like_count
+    
+    def get_user_has_liked(self, obj):
+        if hasattr(obj, 'viewer_has_liked'):
+            return obj.viewer_has_liked
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            return obj.likes.filter(user=request.user).exists()
+        return False
+    
+    def get_comments_count(self, obj):
+        return obj.comment_count
+
+class ImageRenditionsMixin:
+    """
+    Expose the stored renditions as ``{format: srcset}``, e.g.
+    ``{"webp": "https://.../a.w160.webp 160w, ..."}``; empty until rendered.
+    """
+    def get_image_srcset(self, obj):
+        request = self.context.get('request')
+        def build_url(name):
+            url = default_storage.url(name)
+            return request.build_absolute_uri(url) if request else url
+        return srcset(obj.renditions, build_url)
+
+class PhotoSerializer(EngagementFieldsMixin, ImageRenditionsMixin, serializers.ModelSerializer):
     uploaded_by_name = serializers.CharField(source='uploaded_by.get_full_name', read_only=True)
     total_likes = serializers.SerializerMethodField()
     user_has_liked = serializers.SerializerMethodField()
     category_name = serializers.CharField(source='category.name', read_only=True)
     comments_count = serializers.SerializerMethodField()  
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Photo
-        fields = ['id', 'title', 'description', 'image', 'category', 'category_name',
-                 'photo_type', 'uploaded_by', 'uploaded_by_name', 'likes',
+        fields = ['id', 'title', 'description', 'image', 'image_srcset', 'image_width',
+                 'image_height', 'image_bytes', 'dominant_color', 'placeholder',
+                 'category', 'category_name',
+                 'photo_type', 'uploaded_by', 'uploaded_by_name',
                  'total_likes', 'user_has_liked', 'is_featured', 'is_approved',
                  'comments_count', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'uploaded_by', 'created_at', 'updated_at', 'likes']
-    
-    def get_total_likes(self, obj):
-        return obj.total_likes()
-    
-    def get_user_has_liked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.likes.filter(id=request.user.id).exists()
-        return False
-    
-    def get_comments_count(self, obj):
-        return Comment.objects.filter(
-            content_type=ContentType.objects.get_for_model(obj),
-            object_id=obj.id
-        ).count()
+        read_only_fields = ['id', 'uploaded_by', 'created_at', 'updated_at']
     
     def create(self, validated_data):
         validated_data['uploaded_by'] = self.context['request'].user
         return super().create(validated_data)
 
-class RewardSerializer(serializers.ModelSerializer):
+class PhotoListSerializer(PhotoSerializer):
+    class Meta(PhotoSerializer.Meta):
+        fields = ['id', 'title', 'image', 'image_srcset', 'image_width', 'image_height',
+                 'image_bytes', 'dominant_color', 'placeholder', 'category', 'category_name',
+                 'photo_type', 'uploaded_by', 'uploaded_by_name',
+                 'total_likes', 'user_has_liked', 'is_featured', 'is_approved',
+                 'comments_count', 'created_at']
+
+class RewardSerializer(EngagementFieldsMixin, ImageRenditionsMixin, serializers.ModelSerializer):
     awarded_by_name = serializers.CharField(source='awarded_by.get_full_name', read_only=True)
     total_likes = serializers.SerializerMethodField()
     user_has_liked = serializers.SerializerMethodField()
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     comments_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Reward
         fields = ['id', 'student_name', 'student_department', 'student_batch',
-                 'achievement', 'image', 'image_url', 'awarded_by', 
-                 'awarded_by_name', 'likes', 'total_likes', 'user_has_liked',
+                 'achievement', 'image', 'image_url', 'image_srcset', 'image_width',
+                 'image_height', 'image_bytes', 'dominant_color', 'placeholder', 'awarded_by', 
+                 'awarded_by_name', 'total_likes', 'user_has_liked',
                  'comments_count', 'created_at']
-        read_only_fields = ['id', 'awarded_by', 'created_at', 'likes']
-    
-    def get_total_likes(self, obj):
-        return obj.total_likes()
-    
-    def get_user_has_liked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.likes.filter(id=request.user.id).exists()
-        return False
+        read_only_fields = ['id', 'awarded_by', 'created_at']
     
     def get_image_url(self, obj):
         if obj.image:
             return obj.image.url
         return None
     
-    def get_comments_count(self, obj):
-        return Comment.objects.filter(
-            content_type=ContentType.objects.get_for_model(obj),
-            object_id=obj.id
-        ).count()
-    
     def create(self, validated_data):
         validated_data['awarded_by'] = self.context['request'].user
         return super().create(validated_data)
 
-class DocumentSerializer(serializers.ModelSerializer):
+class RewardListSerializer(RewardSerializer):
+    class Meta(RewardSerializer.Meta):
+        fields = ['id', 'student_name', 'student_department', 'student_batch',
+                 'achievement', 'image_url', 'image_srcset', 'image_width', 'image_height',
+                 'image_bytes', 'dominant_color', 'placeholder', 'awarded_by', 'awarded_by_name',
+                 'total_likes', 'user_has_liked', 'comments_count', 'created_at']
+
+class DocumentSerializer(EngagementFieldsMixin, serializers.ModelSerializer):
     uploaded_by_name = serializers.CharField(source='uploaded_by.get_full_name', read_only=True)
     total_likes = serializers.SerializerMethodField()
     user_has_liked = serializers.SerializerMethodField()
@@ -142,30 +170,71 @@ class DocumentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Document
         fields = ['id', 'title', 'description', 'document_type', 'file',
-                 'uploaded_by', 'uploaded_by_name', 'likes', 'total_likes',
+                 'uploaded_by', 'uploaded_by_name', 'total_likes',
                  'user_has_liked', 'is_approved', 'comments_count',
                  'created_at', 'updated_at']
-        read_only_fields = ['id', 'uploaded_by', 'created_at', 'updated_at', 'likes']
-    
-    def get_total_likes(self, obj):
-        return obj.total_likes()
-    
-    def get_user_has_liked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.likes.filter(id=request.user.id).exists()
-        return False
-    
-    def get_comments_count(self, obj):
-        return Comment.objects.filter(
-            content_type=ContentType.objects.get_for_model(obj),
-            object_id=obj.id
-        ).count()
+        read_only_fields = ['id', 'uploaded_by', 'created_at', 'updated_at']
     
     def create(self, validated_data):
         validated_data['uploaded_by'] = self.context['request'].user
         return super().create(validated_data)
 
+class DocumentListSerializer(DocumentSerializer):
+    class Meta(DocumentSerializer.Meta):
+        fields = ['id', 'title', 'document_type', 'file',
+                 'uploaded_by', 'uploaded_by_name', 'total_likes',
+                 'user_has_liked', 'is_approved', 'comments_count', 'created_at']
+
+class DocumentUploadSerializer(serializers.ModelSerializer):
+    """
+    Starts a resumable document upload: the document's details plus the name
+    and total size of the file that will follow in chunks.
+    """
+    filename = serializers.CharField(max_length=255, write_only=True)
+    size = serializers.IntegerField(min_value=1, max_value=MAX_UPLOAD_SIZE, write_only=True)
+    
+    class Meta:
+        model = Document
+        fields = ['title', 'description', 'document_type', 'filename', 'size']
+    
+    def validate_filename(self, value):
+        # Same extension rules as a direct upload
+        for validator in Document._meta.get_field('file').validators:
+            try:
+                validator(File(None, name=value))
+            except DjangoValidationError as error:
+                raise serializers.ValidationError(error.messages)
+        return value
+
+class UploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Upload
+        fields = ['id', 'filename', 'size', 'offset', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+class PhotoSearchSerializer(serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    
+    class Meta:
+        model = Photo
+        fields = ['id', 'title', 'image', 'category_name', 'like_count', 'created_at']
+
+class RewardSearchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Reward
+        fields = ['id', 'student_name', 'student_department', 'student_batch',
+                 'image', 'like_count', 'created_at']
+
+class DocumentSearchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Document
+        fields = ['id', 'title', 'document_type', 'file', 'like_count', 'created_at']
+
+class LikerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'batch']
+
 class CommentSerializer(serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
     user_batch = serializers.CharField(source='user.batch', read_only=True)
@@ -205,7 +274,7 @@ class RepresentativeRequestSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 class FeaturedPhotoSerializer(serializers.ModelSerializer):
-    photo_details = PhotoSerializer(source='photo', read_only=True)
+    photo_details = PhotoListSerializer(source='photo', read_only=True)
     
     class Meta:
         model = FeaturedPhoto
@@ -1,36 +1,177 @@
-from django.db.models.signals import post_save, m2m_changed
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
-from .models import Photo, FeaturedPhoto
-
-@receiver(m2m_changed, sender=Photo.likes.through)
-def update_featured_status(sender, instance, action, **kwargs):
-    """
-    Automatically feature photos that reach a certain like threshold
-    """
-    if action == 'post_add':
-        like_threshold = 10  # Adjust this threshold as needed
-        
-        if instance.total_likes() >= like_threshold and not instance.is_featured:
-            instance.is_featured = True
-            instance.save()
-            
-            # Create featured photo entry if it doesn't exist
-            FeaturedPhoto.objects.get_or_create(
-                photo=instance,
-                defaults={'is_active': True}
-            )
+from .authentication import invalidate_users
+from .featuring import promote, set_featured
+from .models import (
+    User, Category, EngagementCounters, Photo, Reward, Document, Comment, Like, FeaturedPhoto
+)
+from .response_cache import bump_versions
+from .search import SEARCH_FIELDS, update_search_vector
+from media.dedup import acquire, release
+from media.renditions import copy_processed, schedule_renditions
+
+
+def adjust_counter(model, pks, field, delta):
+    """
+    Atomically shift a denormalized counter on ``model`` rows by ``delta``
+    without letting it drop below zero.
+    """
+    if not pks or not delta:
+        return
+    model.objects.filter(pk__in=pks).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Drop the user from the JWT authentication cache whenever the row changes
+    """
+    invalidate_users([instance.pk])
+
+
+# User columns that never appear in cached payloads; saving only these (as
+# simplejwt does with last_login on every login) leaves cached responses valid
+UNCACHED_USER_FIELDS = frozenset({'last_login', 'last_activity', 'password'})
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+@receiver(post_save, sender=Reward)
+@receiver(post_delete, sender=Reward)
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+@receiver(post_save, sender=FeaturedPhoto)
+@receiver(post_delete, sender=FeaturedPhoto)
+def invalidate_cached_responses(sender, update_fields=None, **kwargs):
+    """
+    Retire cached anonymous responses built from the changed model
+    """
+    if sender is User and update_fields and UNCACHED_USER_FIELDS.issuperset(update_fields):
+        return
+    bump_versions(sender)
+
+
+def _counted_target(content_type_id):
+    model = ContentType.objects.get_for_id(content_type_id).model_class()
+    if model is None or not issubclass(model, EngagementCounters):
+        return None
+    return model
+
+@receiver(post_save, sender=Like)
+def increment_like_count(sender, instance, created, **kwargs):
+    """
+    Keep ``like_count`` in step with likes created through the ORM; the
+    ``like`` toggle writes its own counter update.
+    """
+    model = _counted_target(instance.content_type_id)
+    if created and model is not None:
+        adjust_counter(model, [instance.object_id], 'like_count', 1)
+        bump_versions(model)
+        if model is Photo:
+            promote(instance.object_id)
+
+@receiver(post_delete, sender=Like)
+def decrement_like_count(sender, instance, **kwargs):
+    model = _counted_target(instance.content_type_id)
+    if model is not None:
+        adjust_counter(model, [instance.object_id], 'like_count', -1)
+        bump_versions(model)
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    """
+    Keep the commented object's ``comment_count`` in step with new comments
+    """
+    model = _counted_target(instance.content_type_id)
+    if created and model is not None:
+        adjust_counter(model, [instance.object_id], 'comment_count', 1)
+        bump_versions(model)
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    model = _counted_target(instance.content_type_id)
+    if model is not None:
+        adjust_counter(model, [instance.object_id], 'comment_count', -1)
+        bump_versions(model)
+
+@receiver(post_save, sender=Photo)
+@receiver(post_save, sender=Reward)
+@receiver(post_save, sender=Document)
+def refresh_search_vector(sender, instance, update_fields=None, **kwargs):
+    """
+    Keep the stored tsvector in step with the searchable text columns
+    """
+    searchable = {name for name, _ in SEARCH_FIELDS[sender]}
+    if update_fields is not None and not searchable.intersection(update_fields):
+        return
+    update_search_vector(sender, [instance.pk])
+
+@receiver(post_save, sender=Photo)
+@receiver(post_save, sender=Reward)
+def queue_image_renditions(sender, instance, update_fields=None, **kwargs):
+    """
+    Render sized derivatives whenever a new image is stored
+    """
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if instance.image and instance.renditions.get('source') != instance.image.name:
+        if not copy_processed(instance):
+            schedule_renditions(instance)
+
+# Content-addressed file fields, whose blobs are reference counted
+STORED_FILE_FIELDS = {Photo: 'image', Document: 'file'}
+
+def _stored_name(value):
+    return getattr(value, 'name', value) or ''
+
+@receiver(post_init, sender=Photo)
+@receiver(post_init, sender=Document)
+def remember_stored_file(sender, instance, **kwargs):
+    # Raw column value; None when the field was deferred and is unknown
+    value = instance.__dict__.get(STORED_FILE_FIELDS[sender])
+    instance._stored_file = None if value is None else _stored_name(value)
 
 @receiver(post_save, sender=Photo)
-def handle_featured_photo(sender, instance, created, **kwargs):
-    """
-    Manage FeaturedPhoto entries when photo is saved
-    """
-    if instance.is_featured:
-        FeaturedPhoto.objects.get_or_create(
-            photo=instance,
-            defaults={'is_active': True}
-        )
-    else:
-        # Remove from featured photos if unfeatured
-        FeaturedPhoto.objects.filter(photo=instance).update(is_active=False)
\ No newline at end of file
+@receiver(post_save, sender=Document)
+def count_blob_references(sender, instance, created, **kwargs):
+    """
+    Move the blob reference when a record starts pointing at another file
+    """
+    name = _stored_name(getattr(instance, STORED_FILE_FIELDS[sender]))
+    previous = '' if created else instance._stored_file
+    if previous is None or previous == name:
+        return
+    if name:
+        acquire(name)
+    if previous:
+        release(previous)
+    instance._stored_file = name
+
+@receiver(post_delete, sender=Photo)
+@receiver(post_delete, sender=Document)
+def release_blob_reference(sender, instance, **kwargs):
+    release(_stored_name(getattr(instance, STORED_FILE_FIELDS[sender])))
+
+@receiver(post_init, sender=Photo)
+def remember_featured(sender, instance, **kwargs):
+    instance._was_featured = instance.__dict__.get('is_featured')
+
+@receiver(post_save, sender=Photo)
+def sync_featured_entry(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Start or end the photo's featured run when a save flips ``is_featured``;
+    saves that leave it alone cost nothing.
+    """
+    if update_fields is not None and 'is_featured' not in update_fields:
+        return
+    if instance.is_featured != instance._was_featured and (instance.is_featured or not created):
+        set_featured([instance.pk], instance.is_featured)
+    instance._was_featured = instance.is_featured
@@ -0,0 +1,177 @@
+import logging
+import random
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import BackgroundJob
+from .scheduler import HOST
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, 'JOB_QUEUE_MAX_ATTEMPTS', 5)
+RETRY_DELAY = getattr(settings, 'JOB_QUEUE_RETRY_DELAY', 30)
+RETRY_MAX_DELAY = getattr(settings, 'JOB_QUEUE_RETRY_MAX_DELAY', 6 * 60 * 60)
+VISIBILITY_TIMEOUT = getattr(settings, 'JOB_QUEUE_VISIBILITY_TIMEOUT', 15 * 60)
+ERROR_LIMIT = 10000
+
+
+def enqueue(task, *args, delay=0, max_attempts=MAX_ATTEMPTS):
+    """
+    Queue a call to ``task``, the dotted path of a function, with JSON
+    ``args``. The row is written in the caller's transaction, so workers only
+    see the job once the work that queued it has committed.
+    """
+    return BackgroundJob.objects.create(
+        task=task, args=list(args), max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def claim(worker, limit=1):
+    """
+    Mark up to ``limit`` due jobs as running for ``worker`` and return them.
+    ``SKIP LOCKED`` lets concurrent workers pass over rows another one is
+    claiming instead of queueing behind it. Jobs still running after
+    ``VISIBILITY_TIMEOUT`` are assumed lost with their worker and handed out
+    again, so tasks must be safe to run twice.
+    """
+    now = timezone.now()
+    due = Q(status='queued', run_at__lte=now) | Q(
+        status='running', locked_at__lt=now - timedelta(seconds=VISIBILITY_TIMEOUT)
+    )
+    with transaction.atomic():
+        jobs = list(BackgroundJob.objects.select_for_update(skip_locked=True).filter(due).order_by('run_at')[:limit])
+        if not jobs:
+            return []
+        BackgroundJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status='running', locked_by=worker, locked_at=now, attempts=F('attempts') + 1, updated_at=now
+        )
+    for job in jobs:
+        job.status, job.locked_by, job.locked_at = 'running', worker, now
+        job.attempts += 1
+    return jobs
+
+
+def backoff(attempts):
+    """
+    Seconds before retry number ``attempts``: doubling from ``RETRY_DELAY``
+    up to ``RETRY_MAX_DELAY``, plus jitter so a burst of failures spreads out.
+    """
+    delay = min(RETRY_DELAY * 2 ** max(attempts - 1, 0), RETRY_MAX_DELAY)
+    return delay + random.uniform(0, delay / 2)
+
+
+def execute(job):
+    """
+    Run a claimed job. Success deletes it; a failure is retried after
+    ``backoff`` until ``max_attempts``, then the job is left ``dead`` with its
+    traceback. Updates are conditional on still holding the claim, so a
+    worker that overran its timeout cannot undo a newer attempt. Returns True
+    on success.
+    """
+    claimed = BackgroundJob.objects.filter(pk=job.pk, locked_by=job.locked_by, locked_at=job.locked_at)
+    try:
+        import_string(job.task)(*job.args)
+    except Exception:
+        logger.exception('Job %s %s failed (attempt %s of %s)', job.pk, job.task, job.attempts, job.max_attempts)
+        now = timezone.now()
+        error = traceback.format_exc()[-ERROR_LIMIT:]
+        if job.attempts >= job.max_attempts:
+            claimed.update(status='dead', last_error=error, updated_at=now)
+        else:
+            claimed.update(
+                status='queued', last_error=error, locked_at=None, updated_at=now,
+                run_at=now + timedelta(seconds=backoff(job.attempts)),
+            )
+        return False
+    claimed.delete()
+    return True
+
+
+def run_pending(worker=f'{HOST}:inline'):
+    """
+    Claim and run due jobs in the calling thread until none are left, and
+    return ``(succeeded, failed)``. For tests and one-off maintenance; the
+    services run jobs through ``WorkerPool``.
+    """
+    succeeded = failed = 0
+    while True:
+        jobs = claim(worker, limit=10)
+        if not jobs:
+            return succeeded, failed
+        for job in jobs:
+            if execute(job):
+                succeeded += 1
+            else:
+                failed += 1
+
+
+def requeue(queryset):
+    """
+    Put jobs back in the queue with a fresh set of attempts
+    """
+    now = timezone.now()
+    return queryset.update(status='queued', attempts=0, run_at=now, locked_by='', locked_at=None, updated_at=now)
+
+
+class WorkerPool:
+    """
+    ``concurrency`` threads, each with its own database connection, claiming
+    and running jobs until stopped. Idle workers poll every ``poll_interval``
+    seconds. With ``burst`` each thread exits once nothing is due.
+    """
+
+    def __init__(self, concurrency=1, poll_interval=1, burst=False):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.stopping = threading.Event()
+        self.succeeded = self.failed = 0
+        self._lock = threading.Lock()
+
+    def work(self, index):
+        worker = f'{HOST}:{index}'
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                try:
+                    jobs = claim(worker)
+                except DatabaseError:
+                    # Database restarting or unreachable: drop the connection and retry later
+                    logger.exception('Claiming jobs failed')
+                    connection.close()
+                    self.stopping.wait(self.poll_interval * 5)
+                    continue
+                if not jobs:
+                    if self.burst:
+                        return
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                for job in jobs:
+                    succeeded = execute(job)
+                    with self._lock:
+                        if succeeded:
+                            self.succeeded += 1
+                        else:
+                            self.failed += 1
+        finally:
+            connection.close()
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self.work, args=(index,), name=f'job-worker-{index}')
+            for index in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def stop(self, *args):
+        self.stopping.set()
@@ -1,3 +1,409 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgreSQLWrapper
+from django.db.models import F
+from django.test import Client, TestCase
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+from . import tasks
+from .activity import activity_buffer
+from .models import BackgroundJob, Category, Comment, DeadJob, Document, Like, Photo, Reward, User
+from .pagination import KeysetPagination
+from .response_cache import response_cache
+from .search import PrefixILike, suggest_cache
+
+
+class APITestCase(TestCase):
+    """
+    A user, a category and helpers for photos. The in-process caches outlive
+    each test's transaction, so they start empty every time.
+    """
+
+    def setUp(self):
+        cache.clear()
+        response_cache.clear()
+        suggest_cache.clear()
+        # Flush sampled last_activity writes while the test database exists
+        self.addCleanup(activity_buffer.flush)
+        self.client = APIClient()
+        self.user = self.make_user('alice')
+        self.category = Category.objects.create(name='Graduation', created_by=self.user)
+
+    def make_user(self, username, **fields):
+        return User.objects.create_user(
+            username=username, email=f'{username}@example.com', password='pw-12345!',
+            first_name=username.title(), last_name='Tester', **fields
+        )
+
+    def make_photo(self, title='photo', **fields):
+        fields.setdefault('is_approved', True)
+        fields.setdefault('uploaded_by', self.user)
+        return Photo.objects.create(
+            title=title, image=f'photos/{title.replace(" ", "-")}.jpg', category=self.category, **fields
+        )
+
+
+class SearchTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_photo('Graduation ceremony', description='Class of 2026 on the main campus')
+        self.make_photo('Football final', description='The graduation cup match')
+        self.make_photo('Graduation rehearsal', is_approved=False)
+        Reward.objects.create(
+            student_name='Abebe Kebede', student_department='Medicine', student_batch='2026',
+            achievement='Top graduation thesis', awarded_by=self.user
+        )
+        Document.objects.create(
+            title='Graduation guide', document_type='book', file='documents/guide.pdf',
+            uploaded_by=self.user, is_approved=True
+        )
+
+
+class SearchTests(SearchTestCase):
+    def search(self, **params):
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_matches_titles_and_descriptions_of_approved_rows(self):
+        data = self.search(q='graduation')
+        self.assertEqual(
+            sorted(hit['title'] for hit in data['photos']), ['Football final', 'Graduation ceremony']
+        )
+        self.assertEqual([hit['student_name'] for hit in data['rewards']], ['Abebe Kebede'])
+        self.assertEqual([hit['title'] for hit in data['documents']], ['Graduation guide'])
+
+    def test_limit_offset_and_has_more(self):
+        first = self.search(q='graduation', type='photos', limit=1)
+        second = self.search(q='graduation', type='photos', limit=1, offset=1)
+        self.assertTrue(first['has_more']['photos'])
+        self.assertFalse(second['has_more']['photos'])
+        self.assertNotEqual(first['photos'], second['photos'])
+        self.assertNotIn('rewards', first)
+
+    def test_rejects_non_integer_limit(self):
+        response = self.client.get('/api/search/', {'q': 'graduation', 'limit': 'ten'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_empty_query_lists_newest_first(self):
+        data = self.search(type='photos')
+        self.assertEqual([hit['title'] for hit in data['photos']], ['Football final', 'Graduation ceremony'])
+
+
+class LikeTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.photo = self.make_photo('Graduation ceremony')
+        self.client.force_authenticate(self.user)
+
+    def like(self, pk):
+        return self.client.post(f'/api/photos/{pk}/like/')
+
+    def test_toggles_like_and_counter(self):
+        liked = self.like(self.photo.pk).json()
+        self.assertEqual((liked['total_likes'], liked['user_has_liked']), (1, True))
+        self.assertEqual(Like.objects.filter(user=self.user).count(), 1)
+
+        unliked = self.like(self.photo.pk).json()
+        self.assertEqual((unliked['total_likes'], unliked['user_has_liked']), (0, False))
+        self.assertFalse(Like.objects.exists())
+        self.photo.refresh_from_db()
+        self.assertEqual(self.photo.like_count, 0)
+
+    def test_counts_likes_from_several_users(self):
+        self.like(self.photo.pk)
+        self.client.force_authenticate(self.make_user('bob'))
+        self.assertEqual(self.like(self.photo.pk).json()['total_likes'], 2)
+        self.photo.refresh_from_db()
+        self.assertEqual(self.photo.like_count, 2)
+
+    def test_missing_photo_is_404(self):
+        self.assertEqual(self.like(self.photo.pk + 100).status_code, 404)
+        self.assertFalse(Like.objects.exists())
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.like(self.photo.pk).status_code, 401)
+
+
+@mock.patch.object(KeysetPagination, 'page_size', 2)
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.photos = [self.make_photo(f'photo {n}') for n in range(5)]
+
+    def page(self, url='/api/photos/', params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [hit['title'] for hit in data['results']], data['next'], data['previous']
+
+    def test_follows_next_and_previous_links(self):
+        titles, next_url, previous_url = self.page(params={'pagination': 'cursor'})
+        self.assertEqual(titles, ['photo 4', 'photo 3'])
+        self.assertIsNone(previous_url)
+
+        titles, next_url, previous_url = self.page(next_url)
+        self.assertEqual(titles, ['photo 2', 'photo 1'])
+
+        titles, last_next_url, last_previous_url = self.page(next_url)
+        self.assertEqual(titles, ['photo 0'])
+        self.assertIsNone(last_next_url)
+
+        titles, _, _ = self.page(last_previous_url)
+        self.assertEqual(titles, ['photo 2', 'photo 1'])
+        titles, next_url, previous_url = self.page(previous_url)
+        self.assertEqual(titles, ['photo 4', 'photo 3'])
+        self.assertIsNone(previous_url)
+        self.assertIsNotNone(next_url)
+
+    def test_rows_created_after_the_first_page_are_not_repeated(self):
+        _, next_url, _ = self.page(params={'pagination': 'cursor'})
+        self.make_photo('photo 5')
+        titles, _, _ = self.page(next_url)
+        self.assertEqual(titles, ['photo 2', 'photo 1'])
+
+    def test_rejects_other_orderings_and_bad_cursors(self):
+        response = self.client.get('/api/photos/', {'pagination': 'cursor', 'ordering': 'like_count'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.json())
+        self.assertEqual(self.client.get('/api/photos/', {'cursor': 'not-a-cursor'}).status_code, 404)
+        self.assertEqual(self.client.get('/api/photos/', {'ordering': 'like_count'}).status_code, 200)
+
+
+class SuggestTests(SearchTestCase):
+    def suggest(self, q, **params):
+        response = self.client.get('/api/search/suggest/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(hit['type'], hit['text']) for hit in response.json()['suggestions']]
+
+    def test_prefix_matches_across_sources(self):
+        self.assertEqual(sorted(self.suggest('grad')), [
+            ('category', 'Graduation'), ('document', 'Graduation guide'), ('photo', 'Graduation ceremony'),
+        ])
+        self.assertEqual(self.suggest('  ABEBE '), [('reward', 'Abebe Kebede')])
+
+    def test_short_queries_and_limit(self):
+        self.assertEqual(self.suggest('g'), [])
+        self.assertEqual(len(self.suggest('grad', limit=2)), 2)
+
+    def test_fuzzy_prefix_is_a_plain_ilike_on_postgresql(self):
+        postgresql = PostgreSQLWrapper({
+            **connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql', 'OPTIONS': {},
+        }, alias='postgresql')
+        queryset = Photo.objects.filter(PrefixILike(F('title'), '50%_off'))
+        sql, params = queryset.query.get_compiler(connection=postgresql).as_sql()
+        self.assertIn('"core_photo"."title" ILIKE', sql)
+        self.assertNotIn('UPPER', sql)
+        self.assertEqual(params, ('50\\%\\_off%',))
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.photo = self.make_photo('Graduation ceremony')
+
+    def titles(self, **extra):
+        response = self.client.get('/api/photos/', **extra)
+        self.assertEqual(response.status_code, 200)
+        return [hit['title'] for hit in response.json()['results']]
+
+    def test_serves_anonymous_lists_until_the_model_changes(self):
+        self.assertEqual(self.titles(), ['Graduation ceremony'])
+        # update() bypasses the signals, so the cached page is still served
+        Photo.objects.update(title='Renamed')
+        self.assertEqual(self.titles(), ['Graduation ceremony'])
+
+        self.photo.refresh_from_db()
+        self.photo.save()
+        self.assertEqual(self.titles(), ['Renamed'])
+
+    def test_likes_invalidate_cached_counts(self):
+        self.client.get('/api/photos/')
+        self.client.force_authenticate(self.user)
+        self.client.post(f'/api/photos/{self.photo.pk}/like/')
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/photos/').json()['results'][0]['total_likes'], 1)
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.titles()
+        Photo.objects.update(title='Renamed')
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.titles(), ['Renamed'])
+
+    def test_keys_entries_by_scheme(self):
+        http = self.client.get('/api/photos/').json()['results'][0]['image']
+        https = self.client.get('/api/photos/', secure=True).json()['results'][0]['image']
+        self.assertTrue(http.startswith('http://testserver/'))
+        self.assertTrue(https.startswith('https://testserver/'))
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.photo = self.make_photo('Graduation ceremony')
+        self.client.force_authenticate(self.user)
+
+    def test_list_etag_changes_when_a_photo_is_liked(self):
+        etag = self.client.get('/api/photos/')['ETag']
+        self.assertEqual(self.client.get('/api/photos/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.post(f'/api/photos/{self.photo.pk}/like/')
+        response = self.client.get('/api/photos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_changes_when_a_photo_is_deleted(self):
+        self.make_photo('Football final')
+        etag = self.client.get('/api/photos/')['ETag']
+        Photo.objects.filter(pk=self.photo.pk).delete()
+        self.assertEqual(self.client.get('/api/photos/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_counted_resources_ignore_if_modified_since(self):
+        future = http_date(time.time() + 3600)
+        for url in ('/api/photos/', f'/api/photos/{self.photo.pk}/'):
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=future)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('Last-Modified', response)
+
+    def test_detail_validators(self):
+        url = f'/api/photos/{self.photo.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Payloads differ per viewer, and so do the validators
+        self.client.force_authenticate(self.make_user('bob'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(f'/api/photos/{self.photo.pk + 100}/').status_code, 404)
+
+    def test_admin_actions_change_the_etag(self):
+        admin_client = Client()
+        admin_client.force_login(self.make_user('root', is_staff=True, is_superuser=True))
+        url = f'/api/photos/{self.photo.pk}/'
+        for action in ('feature_photos', 'unfeature_photos'):
+            etag = self.client.get(url)['ETag']
+            response = admin_client.post(
+                '/admin/core/photo/', {'action': action, '_selected_action': [self.photo.pk]}
+            )
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        pending = self.make_photo('Football final', is_approved=False)
+        etag = self.client.get('/api/photos/')['ETag']
+        admin_client.post('/admin/core/photo/', {'action': 'approve_photos', '_selected_action': [pending.pk]})
+        self.assertEqual(self.client.get('/api/photos/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_renamed_category_or_author_changes_the_etag(self):
+        etag = self.client.get('/api/photos/')['ETag']
+        self.category.name = 'Commencement'
+        self.category.save()
+        response = self.client.get('/api/photos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['category_name'], 'Commencement')
+
+        comment = Comment.objects.create(
+            user=self.user, content='Congratulations!',
+            content_type=ContentType.objects.get_for_model(Photo), object_id=self.photo.pk
+        )
+        response = self.client.get(f'/api/comments/{comment.pk}/')
+        # The author's name is embedded, so updated_at alone cannot vouch for it
+        self.assertNotIn('Last-Modified', response)
+        self.user.first_name = 'Alicia'
+        self.user.save()
+        self.assertEqual(
+            self.client.get(f'/api/comments/{comment.pk}/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200
+        )
+
+def record_call(*args):
+    JobQueueTests.calls.append(args)
+
+
+def fail(*args):
+    raise RuntimeError('boom')
+
+
+class JobQueueTests(TestCase):
+    calls = []
+
+    def setUp(self):
+        JobQueueTests.calls = []
+
+    def claim_one(self, worker='host:0'):
+        jobs = tasks.claim(worker)
+        self.assertEqual(len(jobs), 1)
+        return jobs[0]
+
+    def make_due(self, job):
+        BackgroundJob.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+    def test_claims_due_jobs_oldest_first(self):
+        later = tasks.enqueue('core.tests.record_call', 2, delay=60)
+        first = tasks.enqueue('core.tests.record_call', 1)
+        second = tasks.enqueue('core.tests.record_call', 3)
+
+        jobs = tasks.claim('host:0', limit=5)
+        self.assertEqual([job.pk for job in jobs], [first.pk, second.pk])
+        self.assertEqual(tasks.claim('host:1'), [])
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.locked_by, first.attempts), ('running', 'host:0', 1))
+        later.refresh_from_db()
+        self.assertEqual(later.status, 'queued')
+
+    def test_success_deletes_the_job(self):
+        tasks.enqueue('core.tests.record_call', 'photo', 7)
+        self.assertTrue(tasks.execute(self.claim_one()))
+        self.assertEqual(JobQueueTests.calls, [('photo', 7)])
+        self.assertFalse(BackgroundJob.objects.exists())
+
+    def test_failures_retry_with_backoff_then_die(self):
+        job = tasks.enqueue('core.tests.fail', max_attempts=2)
+        started = timezone.now()
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertFalse(tasks.execute(self.claim_one()))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('RuntimeError: boom', job.last_error)
+        delay = (job.run_at - started).total_seconds()
+        self.assertTrue(tasks.RETRY_DELAY <= delay <= tasks.RETRY_DELAY * 1.5 + 5, delay)
+        self.assertEqual(tasks.claim('host:0'), [])
+
+        self.make_due(job)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertFalse(tasks.execute(self.claim_one()))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('dead', 2))
+        self.assertEqual(DeadJob.objects.get().pk, job.pk)
+        self.assertEqual(tasks.claim('host:0'), [])
+
+        self.assertEqual(tasks.requeue(BackgroundJob.objects.filter(pk=job.pk)), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 0))
+
+    def test_backoff_doubles_up_to_the_maximum(self):
+        with mock.patch('core.tasks.random.uniform', return_value=0):
+            delays = [tasks.backoff(attempts) for attempts in (1, 2, 3, 100)]
+        self.assertEqual(delays, [
+            tasks.RETRY_DELAY, tasks.RETRY_DELAY * 2, tasks.RETRY_DELAY * 4, tasks.RETRY_MAX_DELAY,
+        ])
+
+    def test_reclaims_jobs_whose_worker_was_lost(self):
+        tasks.enqueue('core.tests.record_call', 1)
+        lost = self.claim_one('host:0')
+        self.assertEqual(tasks.claim('host:1'), [])
+
+        stale = timezone.now() - timedelta(seconds=tasks.VISIBILITY_TIMEOUT + 1)
+        BackgroundJob.objects.filter(pk=lost.pk).update(locked_at=stale)
+        lost.locked_at = stale
+        retried = self.claim_one('host:1')
+        self.assertEqual((retried.pk, retried.attempts), (lost.pk, 2))
+
+        # The first worker finally finishes, but no longer holds the claim
+        self.assertTrue(tasks.execute(lost))
+        self.assertTrue(BackgroundJob.objects.filter(pk=lost.pk, locked_by='host:1').exists())
+        self.assertTrue(tasks.execute(retried))
+        self.assertFalse(BackgroundJob.objects.exists())
@@ -2,8 +2,9 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     UserViewSet, CategoryViewSet, PhotoViewSet, RewardViewSet,
-    DocumentViewSet, CommentViewSet, LikeViewSet, 
-    RepresentativeRequestViewSet, FeaturedPhotoViewSet, SearchViewSet
+    DocumentViewSet, DocumentUploadViewSet, CommentViewSet, LikeViewSet, 
+    RepresentativeRequestViewSet, FeaturedPhotoViewSet, SearchViewSet,
+    MetricsViewSet
 )
 
 router = DefaultRouter()
@@ -12,11 +13,13 @@ router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'photos', PhotoViewSet, basename='photo')
 router.register(r'rewards', RewardViewSet, basename='reward')
 router.register(r'documents', DocumentViewSet, basename='document')
+router.register(r'document-uploads', DocumentUploadViewSet, basename='documentupload')
 router.register(r'comments', CommentViewSet, basename='comment')
 router.register(r'likes', LikeViewSet, basename='like')
 router.register(r'representative-requests', RepresentativeRequestViewSet, basename='representativerequest')
 router.register(r'featured-photos', FeaturedPhotoViewSet, basename='featuredphoto')
 router.register(r'search', SearchViewSet, basename='search')
+router.register(r'metrics', MetricsViewSet, basename='metrics')
 
 # Explicit URL patterns for better clarity
 urlpatterns = [
@@ -2,12 +2,15 @@ from rest_framework import viewsets, status, filters
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import serializers
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Q, Count
+from django.db import DatabaseError, transaction
+from django.db.models import Q, Count, Prefetch
 from django.apps import apps
+from django.conf import settings
 from .models import (
     User, Category, Photo, Reward, Document, Comment, 
     Like, RepresentativeRequest, FeaturedPhoto
@@ -15,10 +18,88 @@ from .models import (
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserSerializer,
     CategorySerializer, PhotoSerializer, RewardSerializer, DocumentSerializer,
-    CommentSerializer, LikeSerializer, RepresentativeRequestSerializer,
-    FeaturedPhotoSerializer
+    PhotoListSerializer, RewardListSerializer, DocumentListSerializer,
+    PhotoSearchSerializer, RewardSearchSerializer, DocumentSearchSerializer,
+    LikerSerializer, CommentSerializer, LikeSerializer,
+    RepresentativeRequestSerializer, FeaturedPhotoSerializer,
+    DocumentUploadSerializer, UploadSerializer
 )
+from .cache import cache_stats
+from .conditional import ConditionalGetMixin
+from .featuring import LIKE_THRESHOLD, promote
+from .likes import toggle_like
+from .pagination import FeedPagination
+from .response_cache import bump_versions, cache_anonymous_response
+from .search import get_search_backend, suggest
 from .permissions import IsOwnerOrReadOnly, IsRepresentative, IsAdminOrRepresentative
+from media.models import Upload
+from media.similarity import DUPLICATE_MAX_DISTANCE, photo_index
+from media.uploads import (
+    CHUNK_MAX_SIZE, OffsetMismatch, UploadBusy, abort_upload, finish_upload, start_upload, write_chunk
+)
+
+
+def with_list_stats(queryset, user):
+    """
+    Annotate engagement counters so that serializing a page costs a fixed
+    number of queries regardless of its size. The search vector is never
+    serialized, so it is not loaded either.
+    """
+    return queryset.defer('search_vector').with_engagement(user)
+
+
+class LikeableViewSetMixin:
+    """
+    Shared behaviour for viewsets over likeable content: a compact serializer
+    for collection actions, the atomic ``like`` toggle and a paginated
+    ``likers`` sub-resource.
+    """
+    list_serializer_class = None
+    list_actions = ('list',)
+    
+    def get_serializer_class(self):
+        if self.action in self.list_actions and self.list_serializer_class is not None:
+            return self.list_serializer_class
+        return super().get_serializer_class()
+    
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def like(self, request, pk=None):
+        # The viewsets' get_permissions() replace permission_classes above
+        if not request.user.is_authenticated:
+            self.permission_denied(request)
+        try:
+            object_id = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound()
+        
+        liked, like_count = toggle_like(self.queryset.model, object_id, request.user.pk)
+        if like_count is None:
+            raise NotFound()
+        bump_versions(self.queryset.model)
+        if liked:
+            self.on_liked(object_id, like_count)
+        
+        return Response({
+            'message': 'Liked' if liked else 'Like removed',
+            'total_likes': like_count,
+            'user_has_liked': liked,
+        })
+    
+    def on_liked(self, pk, like_count):
+        """
+        Hook for per-model side effects of a like; the toggle itself bypasses signals.
+        """
+    
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def likers(self, request, pk=None):
+        obj = self.get_object()
+        likes = obj.likes.select_related('user').order_by('-created_at', '-id')
+        page = self.paginate_queryset(likes)
+        if page is not None:
+            serializer = LikerSerializer([like.user for like in page], many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = LikerSerializer([like.user for like in likes], many=True)
+        return Response(serializer.data)
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
@@ -84,20 +165,30 @@ class CategoryViewSet(viewsets.ModelViewSet):
         # Categories are always visible to everyone
         return queryset
     
+    @cache_anonymous_response(Category, User)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
-class PhotoViewSet(viewsets.ModelViewSet):
+class PhotoViewSet(ConditionalGetMixin, LikeableViewSetMixin, viewsets.ModelViewSet):
     queryset = Photo.objects.all().order_by('-created_at')
     serializer_class = PhotoSerializer
+    list_serializer_class = PhotoListSerializer
+    related_models = (Category, User)
+    pagination_class = FeedPagination
+    list_actions = ('list', 'featured', 'duplicates')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'photo_type', 'is_featured', 'is_approved', 'uploaded_by']
     search_fields = ['title', 'description']
-    ordering_fields = ['created_at', 'updated_at', 'total_likes']
+    ordering_fields = ['created_at', 'updated_at', 'like_count', 'comment_count']
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'destroy']:
             return [IsAuthenticated(), IsOwnerOrReadOnly()]
+        if self.action == 'duplicates':
+            return [IsAdminOrRepresentative()]
         return [AllowAny()]
     
     def get_queryset(self):
@@ -119,31 +210,25 @@ class PhotoViewSet(viewsets.ModelViewSet):
         if batch:
             queryset = queryset.filter(category__batch=batch)
         
-        return queryset
+        return with_list_stats(
+            queryset.select_related('uploaded_by', 'category'), self.request.user
+        )
     
     def perform_create(self, serializer):
         serializer.save(uploaded_by=self.request.user)
     
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
-    def like(self, request, pk=None):
-        photo = self.get_object()
-        user = request.user
-        
-        if photo.likes.filter(id=user.id).exists():
-            photo.likes.remove(user)
-            message = 'Like removed'
-        else:
-            photo.likes.add(user)
-            message = 'Liked'
-        
-        # Update featured status based on likes
-        if photo.total_likes() >= 10:  # Threshold for featured photos
-            photo.is_featured = True
-            photo.save()
-        
-        return Response({'message': message, 'total_likes': photo.total_likes()})
+    def on_liked(self, pk, like_count):
+        # The toggle returns the new count, so exactly one like sees the
+        # threshold being crossed; the scheduled pass covers the rest
+        if like_count == LIKE_THRESHOLD:
+            promote(pk)
+    
+    @cache_anonymous_response(Photo, Category, User)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
     @action(detail=False, methods=['get'])
+    @cache_anonymous_response(Photo, Category, User)
     def featured(self, request):
         featured_photos = self.get_queryset().filter(is_featured=True, is_approved=True)
         page = self.paginate_queryset(featured_photos)
@@ -153,13 +238,38 @@ class PhotoViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(featured_photos, many=True)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'])
+    def duplicates(self, request, pk=None):
+        """
+        Photos that look like this one (re-uploads, resized or re-encoded copies),
+        nearest first. ``?distance=`` overrides the default Hamming radius.
+        """
+        photo = self.get_object()
+        if not photo.perceptual_hash:
+            return Response([])
+        try:
+            distance = min(int(request.query_params.get('distance', DUPLICATE_MAX_DISTANCE)), 32)
+        except ValueError:
+            return Response({'error': 'distance must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        matches = photo_index.search(photo.perceptual_hash, distance, exclude=photo.pk)[:50]
+        photos = self.get_queryset().in_bulk([pk for _, pk in matches])
+        return Response([
+            {'distance': bits, 'photo': self.get_serializer(photos[pk]).data}
+            for bits, pk in matches if pk in photos
+        ])
+    
 
-class RewardViewSet(viewsets.ModelViewSet):
+class RewardViewSet(ConditionalGetMixin, LikeableViewSetMixin, viewsets.ModelViewSet):
     queryset = Reward.objects.all().order_by('-created_at')
     serializer_class = RewardSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    list_serializer_class = RewardListSerializer
+    related_models = (User,)
+    pagination_class = FeedPagination
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['student_batch', 'student_department']
     search_fields = ['student_name', 'achievement']
+    ordering_fields = ['created_at', 'like_count', 'comment_count']
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'destroy']:
@@ -169,32 +279,25 @@ class RewardViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = super().get_queryset()
         # Rewards are always visible to everyone
-        return queryset
+        return with_list_stats(queryset.select_related('awarded_by'), self.request.user)
+    
+    @cache_anonymous_response(Reward, User)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
     def perform_create(self, serializer):
         serializer.save(awarded_by=self.request.user)
-    
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
-    def like(self, request, pk=None):
-        reward = self.get_object()
-        user = request.user
-        
-        if reward.likes.filter(id=user.id).exists():
-            reward.likes.remove(user)
-            message = 'Like removed'
-        else:
-            reward.likes.add(user)
-            message = 'Liked'
-        
-        return Response({'message': message, 'total_likes': reward.total_likes()})
 
-class DocumentViewSet(viewsets.ModelViewSet):
+class DocumentViewSet(ConditionalGetMixin, LikeableViewSetMixin, viewsets.ModelViewSet):
     queryset = Document.objects.all().order_by('-created_at')
     serializer_class = DocumentSerializer
+    list_serializer_class = DocumentListSerializer
+    related_models = (User,)
+    pagination_class = FeedPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['document_type', 'uploaded_by', 'is_approved']
     search_fields = ['title', 'description']
-    ordering_fields = ['created_at', 'updated_at']
+    ordering_fields = ['created_at', 'updated_at', 'like_count', 'comment_count']
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'destroy']:
@@ -215,28 +318,109 @@ class DocumentViewSet(viewsets.ModelViewSet):
                 Q(uploaded_by=self.request.user)
             )
         
-        return queryset
+        return with_list_stats(queryset.select_related('uploaded_by'), self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(uploaded_by=self.request.user)
+
+class DocumentUploadViewSet(viewsets.GenericViewSet):
+    """
+    Resumable uploads for large documents. ``POST`` the document details with
+    the file's name and size, ``PUT`` the bytes in chunks with
+    ``Content-Range: bytes start-end/total`` (or ``?offset=``), then ``POST``
+    to ``finalize`` to create the document. After a dropped connection,
+    ``GET`` returns the offset to resume from.
+    """
+    serializer_class = UploadSerializer
+    permission_classes = [IsAuthenticated]
     
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
-    def like(self, request, pk=None):
-        document = self.get_object()
-        user = request.user
-        
-        if document.likes.filter(id=user.id).exists():
-            document.likes.remove(user)
-            message = 'Like removed'
-        else:
-            document.likes.add(user)
-            message = 'Liked'
+    def get_queryset(self):
+        return Upload.objects.filter(user=self.request.user)
+    
+    def create(self, request):
+        serializer = DocumentUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        details = dict(serializer.validated_data)
+        filename, size = details.pop('filename'), details.pop('size')
+        upload = start_upload(request.user, 'documents', filename, size, details)
+        data = UploadSerializer(upload).data
+        data['chunk_size'] = CHUNK_MAX_SIZE
+        return Response(data, status=status.HTTP_201_CREATED)
+    
+    def retrieve(self, request, pk=None):
+        return Response(UploadSerializer(self.get_object()).data)
+    
+    def chunk_offset(self, request):
+        content_range = request.headers.get('Content-Range', '')
+        if content_range:
+            try:
+                unit, _, rest = content_range.partition(' ')
+                return int(rest.split('-', 1)[0]) if unit == 'bytes' else None
+            except ValueError:
+                return None
+        try:
+            return int(request.query_params.get('offset', ''))
+        except ValueError:
+            return None
+    
+    def update(self, request, pk=None):
+        upload = self.get_object()
+        offset = self.chunk_offset(request)
+        try:
+            length = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = 0
+        if offset is None or length <= 0:
+            return Response(
+                {'error': 'Send the chunk as the request body with a Content-Range header'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if length > CHUNK_MAX_SIZE:
+            return Response(
+                {'error': f'Chunks are limited to {CHUNK_MAX_SIZE} bytes'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
         
-        return Response({'message': message, 'total_likes': document.total_likes()})
+        try:
+            upload = write_chunk(upload, offset, request.stream, length)
+        except OffsetMismatch as mismatch:
+            return Response({'error': str(mismatch), 'offset': mismatch.offset}, status=status.HTTP_409_CONFLICT)
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        except UploadBusy:
+            return Response({'error': 'A chunk for this upload is already in progress'}, status=status.HTTP_409_CONFLICT)
+        except Upload.DoesNotExist:
+            raise NotFound()
+        return Response(UploadSerializer(upload).data)
+    
+    def destroy(self, request, pk=None):
+        abort_upload(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        upload = self.get_object()
+        with transaction.atomic():
+            try:
+                upload = Upload.objects.select_for_update(nowait=True).get(pk=upload.pk)
+                name = finish_upload(upload)
+            except (Upload.DoesNotExist, DatabaseError):
+                return Response({'error': 'Upload is already being finalized'}, status=status.HTTP_409_CONFLICT)
+            except OffsetMismatch as mismatch:
+                return Response(
+                    {'error': 'Upload is incomplete', 'offset': mismatch.offset}, status=status.HTTP_409_CONFLICT
+                )
+            document = Document.objects.create(uploaded_by=request.user, file=name, **upload.metadata)
+            upload.delete()
+        serializer = DocumentSerializer(document, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    counter_fields = ()
+    related_models = (User,)
+    pagination_class = FeedPagination
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['content_type', 'object_id']
@@ -285,9 +469,15 @@ class CommentViewSet(viewsets.ModelViewSet):
             raise serializers.ValidationError({"error": "Invalid content type or object ID"})
 
 class LikeViewSet(viewsets.ModelViewSet):
-    queryset = Like.objects.all()
+    queryset = Like.objects.all().order_by('-created_at')
     serializer_class = LikeSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['content_type']
+    
+    def get_queryset(self):
+        # Everything the current user liked, across photos, rewards and documents
+        return super().get_queryset().filter(user=self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -337,7 +527,14 @@ class FeaturedPhotoViewSet(viewsets.ModelViewSet):
     serializer_class = FeaturedPhotoSerializer
     permission_classes = [IsAdminOrRepresentative]
     
+    def get_queryset(self):
+        photos = with_list_stats(
+            Photo.objects.select_related('uploaded_by', 'category'), self.request.user
+        )
+        return super().get_queryset().prefetch_related(Prefetch('photo', queryset=photos))
+    
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    @cache_anonymous_response(FeaturedPhoto, Photo, Category, User)
     def active(self, request):
         active_featured = self.get_queryset().filter(is_active=True)
         serializer = self.get_serializer(active_featured, many=True)
@@ -345,35 +542,60 @@ class FeaturedPhotoViewSet(viewsets.ModelViewSet):
 
 class SearchViewSet(viewsets.ViewSet):
     permission_classes = [AllowAny]
+    default_limit = 10
     
-    def list(self, request):
-        query = request.query_params.get('q', '')
-        category = request.query_params.get('category', '')
-        
-        results = {}
-        
-        # Search photos
-        photos = Photo.objects.filter(
-            Q(title__icontains=query) | Q(description__icontains=query),
-            is_approved=True
-        )
+    def get_search_targets(self, category):
+        photos = Photo.objects.filter(is_approved=True).select_related('category')
         if category:
             photos = photos.filter(category__name=category)
-        results['photos'] = PhotoSerializer(photos, many=True, context={'request': request}).data
         
-        # Search rewards
-        rewards = Reward.objects.filter(
-            Q(student_name__icontains=query) | Q(achievement__icontains=query)
-        )
-        results['rewards'] = RewardSerializer(rewards, many=True, context={'request': request}).data
-        
-        # Search documents
-        documents = Document.objects.filter(
-            Q(title__icontains=query) | Q(description__icontains=query),
-            is_approved=True
-        )
+        documents = Document.objects.filter(is_approved=True)
         if category in ['exam', 'research', 'project', 'book']:
             documents = documents.filter(document_type=category)
-        results['documents'] = DocumentSerializer(documents, many=True, context={'request': request}).data
         
-        return Response(results)
\ No newline at end of file
+        return {
+            'photos': (photos, PhotoSearchSerializer),
+            'rewards': (Reward.objects.all(), RewardSearchSerializer),
+            'documents': (documents, DocumentSearchSerializer),
+        }
+    
+    def _int_param(self, name, default, maximum):
+        try:
+            value = int(self.request.query_params.get(name, default))
+        except ValueError:
+            raise serializers.ValidationError({name: 'Must be an integer.'})
+        return max(0, min(value, maximum))
+    
+    def list(self, request):
+        query = request.query_params.get('q', '').strip()
+        category = request.query_params.get('category', '')
+        only = request.query_params.get('type')
+        limit = self._int_param('limit', self.default_limit, settings.SEARCH_MAX_LIMIT)
+        offset = self._int_param('offset', 0, 10000)
+        
+        results = {'query': query, 'limit': limit, 'offset': offset, 'has_more': {}}
+        for name, (queryset, serializer_class) in self.get_search_targets(category).items():
+            if only and only != name:
+                continue
+            # Fetch one extra row to know whether another page exists, without a COUNT
+            hits = list(get_search_backend(queryset.model).search(
+                queryset.defer('search_vector'), query
+            )[offset:offset + limit + 1])
+            results['has_more'][name] = len(hits) > limit
+            results[name] = serializer_class(
+                hits[:limit], many=True, context={'request': request}
+            ).data
+        
+        return Response(results)
+    
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        query = request.query_params.get('q', '')
+        limit = self._int_param('limit', 8, settings.SEARCH_SUGGEST_MAX_LIMIT)
+        return Response({'query': query, 'suggestions': suggest(query, limit)})
+
+class MetricsViewSet(viewsets.ViewSet):
+    permission_classes = [IsAdminUser]
+    
+    def list(self, request):
+        return Response({'caches': cache_stats()})
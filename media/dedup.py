@@ -0,0 +1,105 @@
+import os
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Blob
+from .storage import content_addressed_storage, parse_content_address
+
+
+RESERVATION = timedelta(seconds=getattr(settings, 'MEDIA_BLOB_RESERVATION', 15 * 60))
+
+
+def content_addressed_fields():
+    """
+    ``(model, field name)`` for every file field stored by content address
+    """
+    return [
+        (model, field.name)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and field.storage is content_addressed_storage
+    ]
+
+
+@contextmanager
+def reserved(name, size):
+    """
+    Hold the blob row for ``name`` locked (creating it, unreferenced, if
+    needed) and keep purges off it for ``RESERVATION``. Storage decides
+    inside the block whether the stored file can be reused: a purge that got
+    the lock first has already removed the file, and a later one re-checks
+    the reservation under the same lock and leaves the file for the record
+    about to reference it.
+    """
+    sha256 = parse_content_address(name)
+    until = timezone.now() + RESERVATION
+    with transaction.atomic():
+        if not Blob.objects.filter(name=name).update(reserved_until=until):
+            try:
+                with transaction.atomic():
+                    Blob.objects.create(sha256=sha256, name=name, size=size, ref_count=0, reserved_until=until)
+            except IntegrityError:
+                # Another upload created it first
+                Blob.objects.filter(name=name).update(reserved_until=until)
+        yield
+
+
+def acquire(name):
+    """
+    Count one more record pointing at the content-addressed file ``name``.
+    """
+    sha256 = parse_content_address(name)
+    if sha256 is None:
+        return
+    if Blob.objects.filter(name=name).update(ref_count=F('ref_count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            Blob.objects.create(
+                sha256=sha256, name=name, ref_count=1,
+                size=content_addressed_storage.size(name),
+            )
+    except IntegrityError:
+        # Another request created it first
+        Blob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+
+def release(name):
+    """
+    Drop one reference to ``name``; the last one removes the file after commit.
+    """
+    if parse_content_address(name) is None:
+        return
+    Blob.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+    transaction.on_commit(lambda: purge_unreferenced(name))
+
+
+def purge_unreferenced(name):
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(name=name, ref_count=0).filter(
+            Q(reserved_until__isnull=True) | Q(reserved_until__lt=timezone.now())
+        ).first()
+        if blob is None:
+            return False
+        blob.delete()
+        content_addressed_storage.delete(name)
+        delete_derived_files(name)
+    return True
+
+
+def delete_derived_files(name):
+    """
+    Remove renditions rendered next to ``name`` (``<stem>.w<width>.<ext>``)
+    """
+    directory, filename = os.path.split(name)
+    prefix = os.path.splitext(filename)[0] + '.w'
+    if not content_addressed_storage.exists(directory):
+        return
+    for sibling in content_addressed_storage.listdir(directory)[1]:
+        if sibling.startswith(prefix):
+            content_addressed_storage.delete(os.path.join(directory, sibling))
@@ -0,0 +1,127 @@
+import base64
+import io
+import os
+
+from PIL import Image, ImageOps
+
+# Pure Pillow helpers. Nothing here imports Django, so they can run in worker
+# processes that never load settings.
+
+SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'method': 4},
+    'jpeg': {'format': 'JPEG', 'optimize': True, 'progressive': True},
+}
+
+
+def rendition_name(name, width, fmt):
+    """
+    ``photos/party.png`` -> ``photos/party.w480.webp``, next to the original
+    """
+    stem, _ = os.path.splitext(name)
+    extension = 'jpg' if fmt == 'jpeg' else fmt
+    return f'{stem}.w{width}.{extension}'
+
+
+def open_upright(path):
+    image = Image.open(path)
+    image.load()
+    # Phone photos are often stored sideways with an EXIF rotation flag
+    return ImageOps.exif_transpose(image)
+
+
+def flatten(image, background=(255, 255, 255)):
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        canvas = Image.new('RGB', image.size, background)
+        canvas.paste(image, mask=image.getchannel('A'))
+        return canvas
+    return image.convert('RGB')
+
+
+def write_renditions(image, root, name, widths, formats, quality=80):
+    """
+    Write a downscaled copy of ``image`` per width and format next to
+    ``root/name`` and return ``{format: {width: relative name}}``. Widths at or
+    above the original's width collapse into one rendition at the original
+    size; nothing is upscaled.
+    """
+    targets = sorted({min(width, image.width) for width in widths})
+    renditions = {fmt: {} for fmt in formats}
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS) if width < image.width else image
+        for fmt in formats:
+            target = rendition_name(name, width, fmt)
+            output = resized if fmt == 'webp' and resized.mode in ('RGB', 'RGBA') else flatten(resized)
+            output.save(os.path.join(root, target), quality=quality, **SAVE_OPTIONS[fmt])
+            renditions[fmt][str(width)] = target
+    return renditions
+
+
+def dominant_color(image, colors=8):
+    sample = flatten(image)
+    sample.thumbnail((64, 64))
+    palette = sample.quantize(colors=colors)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def placeholder(image, size=16, quality=40):
+    """
+    Low-quality image placeholder: a ``size`` px WebP data URI, a few hundred
+    bytes, for clients to blur while the real image loads.
+    """
+    sample = flatten(image)
+    sample.thumbnail((size, size))
+    buffer = io.BytesIO()
+    sample.save(buffer, format='WEBP', quality=quality)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def perceptual_hash(image, size=8):
+    """
+    64-bit difference hash (dHash) as 16 hex digits. Re-encoded, resized or
+    lightly edited copies of a picture land within a few bits of each other.
+    """
+    gray = flatten(image).convert('L').resize((size + 1, size), Image.LANCZOS)
+    pixels = gray.tobytes()
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for column in range(size):
+            bits = (bits << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return f'{bits:0{size * size // 4}x}'
+
+
+def describe_image(image, path):
+    """
+    The metadata stored alongside each image, keyed by model field name
+    """
+    return {
+        'image_width': image.width,
+        'image_height': image.height,
+        'image_bytes': os.path.getsize(path),
+        'dominant_color': dominant_color(image),
+        'placeholder': placeholder(image),
+        'perceptual_hash': perceptual_hash(image),
+    }
+
+
+def inspect_image(root, name):
+    path = os.path.join(root, name)
+    with open_upright(path) as image:
+        return describe_image(image, path)
+
+
+def process_image(root, name, widths, formats, quality=80):
+    """
+    Everything done to a new upload, from a single decode of the original:
+    ``{'renditions': ..., 'info': ...}``.
+    """
+    path = os.path.join(root, name)
+    with open_upright(path) as image:
+        return {
+            'renditions': write_renditions(image, root, name, widths, formats, quality),
+            'info': describe_image(image, path),
+        }
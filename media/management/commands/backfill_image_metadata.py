@@ -0,0 +1,66 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from core.models import Photo, Reward
+from core.response_cache import bump_versions
+from media.imaging import inspect_image
+from media.workers import submit_bounded
+
+IMAGE_MODELS = {'photo': Photo, 'reward': Reward}
+
+
+def missing_metadata(model, after=0):
+    """
+    ``(pk, image name)`` for rows without stored dimensions or perceptual hash,
+    in primary-key order. Filled rows drop out, so an interrupted run resumes
+    where it stopped.
+    """
+    missing = Q(image_width__isnull=True) | Q(perceptual_hash='')
+    rows = model.objects.filter(missing, pk__gt=after).exclude(image='')
+    return rows.exclude(image__isnull=True).order_by('pk').values_list('pk', 'image').iterator(chunk_size=500)
+
+
+class Command(BaseCommand):
+    help = 'Store dimensions, byte size, dominant color, placeholder and perceptual hash for existing images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(IMAGE_MODELS), action='append',
+                            help='Limit to these models (default: all)')
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                            help='Number of worker processes')
+        parser.add_argument('--after', type=int, default=0,
+                            help='Skip rows up to this primary key, e.g. past known-bad files')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        root = str(settings.MEDIA_ROOT)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for label in options['model'] or sorted(IMAGE_MODELS):
+                model = IMAGE_MODELS[label]
+                started = time.monotonic()
+                filled = failed = 0
+                jobs = (((pk, name), (root, name)) for pk, name in missing_metadata(model, options['after']))
+                for (pk, name), future in submit_bounded(
+                    executor, inspect_image, jobs, window=workers * 4
+                ):
+                    try:
+                        info = future.result()
+                    except Exception as exc:
+                        failed += 1
+                        self.stderr.write(f'{label} {pk}: {name}: {exc}')
+                        continue
+                    # Each row is written as soon as it is ready, so progress survives interruption
+                    filled += model.objects.filter(pk=pk, image=name).update(
+                        updated_at=timezone.now(), **info
+                    )
+                if filled:
+                    bump_versions(model)
+                self.stdout.write(self.style.SUCCESS(
+                    f'{model._meta.verbose_name_plural}: filled {filled}, failed {failed} '
+                    f'in {time.monotonic() - started:.2f}s'
+                ))
@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from core.response_cache import bump_versions
+from media.dedup import content_addressed_fields, purge_unreferenced
+from media.models import Blob
+from media.storage import (
+    content_address, content_addressed_storage, hash_file, link_or_copy, parse_content_address
+)
+from media.workers import submit_bounded
+
+
+def legacy_names(fields):
+    """
+    Stored names that predate content addressing, across every CAS-backed field
+    """
+    names = set()
+    for model, field in fields:
+        values = model.objects.exclude(**{field: ''}).values_list(field, flat=True).distinct()
+        names.update(name for name in values.iterator() if parse_content_address(name) is None)
+    return sorted(names)
+
+
+def rewrite_references(fields, old, new):
+    """
+    Point every record from ``old`` to ``new``; renditions rendered from the
+    same bytes stay valid, so their recorded source is carried over.
+    """
+    with transaction.atomic():
+        for model, field in fields:
+            if 'renditions' in {f.name for f in model._meta.concrete_fields}:
+                for pk, renditions in model.objects.filter(
+                    **{field: old, 'renditions__source': old}
+                ).values_list('pk', 'renditions'):
+                    model.objects.filter(pk=pk).update(renditions={**renditions, 'source': new})
+            model.objects.filter(**{field: old}).update(**{field: new})
+
+
+def recount_blobs(fields):
+    """
+    Recompute every blob's reference count from the records; returns
+    ``(blobs created, counts corrected)``.
+    """
+    counts = Counter()
+    for model, field in fields:
+        for name, total in model.objects.values_list(field).annotate(total=Count('pk')).order_by():
+            if parse_content_address(name):
+                counts[name] += total
+
+    created = corrected = 0
+    for blob in Blob.objects.iterator():
+        actual = counts.pop(blob.name, 0)
+        if blob.ref_count != actual:
+            Blob.objects.filter(pk=blob.pk).update(ref_count=actual)
+            corrected += 1
+            if actual == 0:
+                purge_unreferenced(blob.name)
+    for name, total in counts.items():
+        if content_addressed_storage.exists(name):
+            Blob.objects.create(
+                sha256=parse_content_address(name), name=name, ref_count=total,
+                size=content_addressed_storage.size(name),
+            )
+            created += 1
+    return created, corrected
+
+
+class Command(BaseCommand):
+    help = 'Move existing uploads to content-addressed paths, merging duplicate files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                            help='Number of hashing processes')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report duplicates and reclaimable bytes without changing anything')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        dry_run = options['dry_run']
+        workers = max(1, options['workers'])
+        fields = content_addressed_fields()
+        storage = content_addressed_storage
+
+        hashed = duplicates = missing = reclaimed = 0
+        seen = set()
+        jobs = ((name, (storage.path(name),)) for name in legacy_names(fields))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for name, future in submit_bounded(executor, hash_file, jobs, window=workers * 4):
+                try:
+                    sha256, size = future.result()
+                except OSError as exc:
+                    missing += 1
+                    self.stderr.write(f'{name}: {exc}')
+                    continue
+                hashed += 1
+                target = content_address(os.path.dirname(name), sha256, os.path.splitext(name)[1])
+                duplicate = target in seen or storage.exists(target)
+                seen.add(target)
+                if duplicate:
+                    duplicates += 1
+                    reclaimed += size
+                if dry_run:
+                    continue
+                # Target first, then the records, then the old file: safe to interrupt
+                if not duplicate:
+                    link_or_copy(storage.path(name), storage.path(target))
+                rewrite_references(fields, name, target)
+                storage.delete(name)
+
+        verb = 'would reclaim' if dry_run else 'reclaimed'
+        self.stdout.write(self.style.SUCCESS(
+            f'hashed {hashed} files, {duplicates} duplicates, {verb} {reclaimed} bytes, '
+            f'{missing} missing, in {time.monotonic() - started:.2f}s'
+        ))
+        if not dry_run:
+            created, corrected = recount_blobs(fields)
+            bump_versions(*{model for model, _ in fields})
+            self.stdout.write(self.style.SUCCESS(
+                f'blobs: {created} created, {corrected} reference counts corrected'
+            ))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from media.uploads import EXPIRY, expire_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete abandoned resumable uploads and orphaned temporary upload files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=EXPIRY.total_seconds() / 3600,
+                            help='Only remove uploads untouched for this many hours')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be removed without deleting anything')
+
+    def handle(self, *args, **options):
+        sessions, files, freed = expire_uploads(
+            older_than=timedelta(hours=options['hours']), dry_run=options['dry_run']
+        )
+        verb = 'would remove' if options['dry_run'] else 'removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {sessions} stale uploads and {files} orphaned temp files, {freed} bytes'
+        ))
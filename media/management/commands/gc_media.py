@@ -0,0 +1,141 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import models
+from media.dedup import purge_unreferenced
+from media.models import Blob
+from media.renditions import rendition_files
+from media.storage import UPLOAD_DIRECTORIES, content_addressed_storage as storage, parse_content_address
+from media.workers import submit_bounded
+
+
+def referenced_names():
+    """
+    Every stored name something still points at: file field values,
+    rendition files recorded next to them, and blobs with live references.
+    Streamed with ``values_list``; no model instances are built.
+    """
+    names = set()
+    for model in apps.get_models():
+        fields = [field.name for field in model._meta.concrete_fields if isinstance(field, models.FileField)]
+        if 'renditions' in {field.name for field in model._meta.concrete_fields}:
+            for renditions in model.objects.values_list('renditions', flat=True).iterator(chunk_size=2000):
+                names.update(rendition_files(renditions or {}))
+        for field in fields:
+            values = model.objects.exclude(**{field: ''}).values_list(field, flat=True)
+            names.update(name for name in values.iterator(chunk_size=5000) if name)
+    names.update(Blob.objects.filter(ref_count__gt=0).values_list('name', flat=True).iterator(chunk_size=5000))
+    return names
+
+
+def subtrees():
+    """
+    Units of work for the walk: each upload directory's own files, plus one
+    job per child directory (the shard fan-out spreads files evenly).
+    """
+    for directory in sorted(UPLOAD_DIRECTORIES):
+        root = storage.path(directory)
+        try:
+            entries = list(os.scandir(root))
+        except FileNotFoundError:
+            continue
+        yield directory, (directory, False)
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'):
+                yield f'{directory}/{entry.name}', (f'{directory}/{entry.name}', True)
+
+
+def scan(directory, recursive):
+    """
+    ``[(name, size, changed)]`` for the files under ``directory``. Dotfiles
+    (in-flight uploads) belong to ``expire_uploads``. ``changed`` also counts
+    ctime, which a fresh hard link bumps while keeping the old mtime.
+    """
+    found = []
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        try:
+            entries = list(os.scandir(storage.path(current)))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            name = f'{current}/{entry.name}'
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        pending.append(name)
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    found.append((name, st.st_size, max(st.st_mtime, st.st_ctime)))
+            except FileNotFoundError:
+                continue
+    return found
+
+
+class Command(BaseCommand):
+    help = 'Find and delete uploaded files that no record references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Number of directory-walking threads')
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Leave files changed within this many hours alone')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report orphans without deleting them')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        dry_run = options['dry_run']
+        workers = max(1, options['workers'])
+        cutoff = time.time() - options['grace_hours'] * 3600
+
+        referenced = referenced_names()
+        self.stdout.write(f'{len(referenced)} referenced names loaded in {time.monotonic() - started:.2f}s')
+
+        scanned = scanned_bytes = orphans = orphan_bytes = recent = 0
+        reported_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for directory, future in submit_bounded(executor, scan, subtrees(), window=workers * 2):
+                for name, size, changed in future.result():
+                    scanned += 1
+                    scanned_bytes += size
+                    if name in referenced:
+                        continue
+                    if changed > cutoff:
+                        recent += 1
+                        continue
+                    orphans += 1
+                    orphan_bytes += size
+                    if options['verbosity'] >= 2:
+                        self.stdout.write(f'orphan: {name} ({size} bytes)')
+                    if not dry_run:
+                        self.remove(name)
+                if time.monotonic() - reported_at >= 5:
+                    reported_at = time.monotonic()
+                    elapsed = reported_at - started
+                    self.stdout.write(
+                        f'... {scanned} files scanned ({scanned / elapsed:.0f}/s), {orphans} orphans so far'
+                    )
+
+        elapsed = time.monotonic() - started
+        verb = 'would free' if dry_run else 'freed'
+        self.stdout.write(self.style.SUCCESS(
+            f'scanned {scanned} files ({scanned_bytes} bytes) in {elapsed:.2f}s, '
+            f'{scanned / elapsed if elapsed else 0:.0f} files/s; {orphans} orphans, {verb} {orphan_bytes} bytes; '
+            f'{recent} unreferenced but inside the grace period'
+        ))
+
+    def remove(self, name):
+        # Content-addressed files are only ever removed through the purge,
+        # which re-checks the blob's count under its row lock: a blob that
+        # was re-referenced since the scan is left alone
+        if parse_content_address(name):
+            purge_unreferenced(name)
+            return
+        storage.delete(name)
@@ -0,0 +1,59 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from core.models import Photo, Reward
+from media.imaging import process_image
+from media.renditions import render_job, save_processed
+from media.workers import submit_bounded
+
+IMAGE_MODELS = {'photo': Photo, 'reward': Reward}
+
+
+def missing_renditions(model, force=False):
+    """
+    ``(pk, image name)`` for rows whose renditions are absent or stale
+    """
+    rows = model.objects.exclude(image='').exclude(image__isnull=True).order_by('pk')
+    for pk, name, renditions in rows.values_list('pk', 'image', 'renditions').iterator(chunk_size=500):
+        if force or renditions.get('source') != name:
+            yield pk, name
+
+
+class Command(BaseCommand):
+    help = 'Render missing WebP/JPEG renditions for existing photo and reward images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(IMAGE_MODELS), action='append',
+                            help='Limit to these models (default: all)')
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                            help='Number of rendering processes')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render images that already have renditions')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for label in options['model'] or sorted(IMAGE_MODELS):
+                model = IMAGE_MODELS[label]
+                started = time.monotonic()
+                rendered = failed = 0
+                jobs = (
+                    ((pk, name), render_job(name))
+                    for pk, name in missing_renditions(model, options['force'])
+                )
+                for (pk, name), future in submit_bounded(
+                    executor, process_image, jobs, window=workers * 4
+                ):
+                    try:
+                        result = future.result()
+                    except Exception as exc:
+                        failed += 1
+                        self.stderr.write(f'{label} {pk}: {name}: {exc}')
+                        continue
+                    rendered += save_processed(model, pk, name, result)
+                self.stdout.write(self.style.SUCCESS(
+                    f'{model._meta.verbose_name_plural}: rendered {rendered}, failed {failed} '
+                    f'in {time.monotonic() - started:.2f}s'
+                ))
@@ -0,0 +1,154 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from core.response_cache import bump_versions
+from media.paths import ShardedUploadTo, is_sharded, sharded_target
+from media.renditions import rendition_files
+from media.storage import content_addressed_storage as storage, link_or_copy
+from media.workers import submit_bounded, throttled
+
+
+def sharded_fields():
+    """
+    ``(model, field)`` for every file field whose ``upload_to`` shards names
+    """
+    return [
+        (model, field)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and isinstance(field.upload_to, ShardedUploadTo)
+    ]
+
+
+def has_renditions(model):
+    return 'renditions' in {field.name for field in model._meta.concrete_fields}
+
+
+def legacy_files(model, field):
+    """
+    ``(name, renditions)`` per stored name outside the sharded layout. Moved
+    rows drop out, so an interrupted run resumes where it stopped.
+    """
+    columns = [field.name, 'renditions'] if has_renditions(model) else [field.name]
+    rows = model.objects.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+    seen = set()
+    for row in rows.order_by(field.name).values_list(*columns).iterator(chunk_size=1000):
+        name = row[0]
+        if name in seen or is_sharded(name):
+            continue
+        seen.add(name)
+        renditions = row[1] if len(row) > 1 and row[1].get('source') == name else None
+        yield name, renditions
+
+
+def move_file(directory, name, renditions):
+    """
+    Link ``name`` (and its renditions) at the sharded target; the old files
+    stay until the records point at the new ones. Returns ``(target, renditions)``.
+    """
+    target = sharded_target(directory, name, os.stat(storage.path(name)).st_mtime)
+    link_or_copy(storage.path(name), storage.path(target))
+    if not renditions:
+        return target, None
+
+    old_stem, new_stem = os.path.splitext(name)[0], os.path.splitext(target)[0]
+    formats = {}
+    for fmt, sizes in renditions.get('formats', {}).items():
+        formats[fmt] = {}
+        for width, rendition in sizes.items():
+            moved = new_stem + rendition[len(old_stem):] if rendition.startswith(old_stem) else rendition
+            if moved != rendition and storage.exists(rendition):
+                link_or_copy(storage.path(rendition), storage.path(moved))
+            formats[fmt][width] = moved
+    return target, {**renditions, 'source': target, 'formats': formats}
+
+
+def rewrite_paths(model, field, moves):
+    """
+    Point every row at its moved file in one UPDATE per batch.
+    ``moves`` maps old name to ``(new name, new renditions or None)``.
+    """
+    values = {
+        field.name: Case(
+            *[When(**{field.name: old}, then=Value(new)) for old, (new, _) in moves.items()],
+            output_field=models.CharField(),
+        ),
+    }
+    rendition_cases = [
+        When(**{field.name: old, 'renditions__source': old}, then=Value(renditions, output_field=models.JSONField()))
+        for old, (_, renditions) in moves.items() if renditions
+    ]
+    if rendition_cases:
+        values['renditions'] = Case(*rendition_cases, default=F('renditions'), output_field=models.JSONField())
+    with transaction.atomic():
+        return model.objects.filter(**{f'{field.name}__in': list(moves)}).update(**values)
+
+
+def delete_old_files(moves, renditions_by_name):
+    for old in moves:
+        storage.delete(old)
+        for rendition in rendition_files(renditions_by_name.get(old) or {}):
+            storage.delete(rendition)
+
+
+class Command(BaseCommand):
+    help = 'Move files of sharded upload fields from flat directories into the sharded layout'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of file-moving threads')
+        parser.add_argument('--rate', type=float, default=0,
+                            help='Move at most this many files per second (default: unlimited)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows rewritten per UPDATE')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='List what would move without changing anything')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+        touched = set()
+        for model, field in sharded_fields():
+            started = time.monotonic()
+            label = f'{model._meta.label}.{field.name}'
+            files = list(legacy_files(model, field))
+            if options['dry_run']:
+                self.stdout.write(f'{label}: {len(files)} files to move')
+                continue
+
+            renditions_by_name = dict(files)
+            moved = rows = missing = 0
+            batch = {}
+            jobs = ((name, (field.upload_to.directory, name, renditions)) for name, renditions in files)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for name, future in submit_bounded(
+                    executor, move_file, throttled(jobs, options['rate']), window=workers * 4
+                ):
+                    try:
+                        batch[name] = future.result()
+                    except OSError as exc:
+                        missing += 1
+                        self.stderr.write(f'{name}: {exc}')
+                        continue
+                    if len(batch) >= batch_size:
+                        rows += rewrite_paths(model, field, batch)
+                        delete_old_files(batch, renditions_by_name)
+                        moved += len(batch)
+                        batch = {}
+            if batch:
+                rows += rewrite_paths(model, field, batch)
+                delete_old_files(batch, renditions_by_name)
+                moved += len(batch)
+            if rows:
+                touched.add(model)
+            self.stdout.write(self.style.SUCCESS(
+                f'{label}: moved {moved} files, rewrote {rows} rows, {missing} missing, '
+                f'in {time.monotonic() - started:.2f}s'
+            ))
+        if touched:
+            bump_versions(*touched)
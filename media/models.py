@@ -1,3 +1,46 @@
-from django.db import models
-
-# Create your models here.
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class Blob(models.Model):
+    """
+    A content-addressed file and the number of records that point at it.
+    The file is only deleted when the last reference goes away, and not
+    while ``reserved_until`` is ahead: an upload that reused the stored file
+    holds it until the record pointing at it is saved.
+    """
+    sha256 = models.CharField(max_length=64, db_index=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    reserved_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Upload(models.Model):
+    """
+    A resumable upload in progress. Chunks are appended to a hidden
+    ``.upload-<id>`` file inside the target upload directory, so finishing
+    the upload is a rename into its content address rather than a copy.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='uploads')
+    directory = models.CharField(max_length=100)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    metadata = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    @property
+    def temp_name(self):
+        return f'{self.directory}/.upload-{self.pk.hex}'
+
+    def __str__(self):
+        return f'{self.filename} ({self.offset}/{self.size})'
@@ -0,0 +1,51 @@
+import os
+import re
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+SHARDED_NAME = re.compile(r'^(?:.+/)?\d{4}/\d{2}/[0-9a-f]{2}/[0-9a-f]{32}(?:\.\w+)?$')
+
+
+def sharded_name(directory, key, when, extension=''):
+    """
+    ``rewards/2026/10/3f/3f2a...c1.png``: a month directory keeps backups and
+    listings incremental, and the two-hex-digit fan-out under it keeps each
+    directory to a few hundred entries.
+    """
+    return f'{directory}/{when:%Y/%m}/{key[:2]}/{key}{extension.lower()}'
+
+
+def is_sharded(name):
+    return bool(SHARDED_NAME.match(name or ''))
+
+
+@deconstructible
+class ShardedUploadTo:
+    """
+    ``upload_to`` for fields that are not content-addressed: a random name
+    under ``directory``, sharded by month and name prefix. The client's
+    filename only contributes its extension.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory.strip('/')
+
+    def __call__(self, instance, filename):
+        extension = os.path.splitext(filename)[1]
+        return sharded_name(self.directory, uuid.uuid4().hex, timezone.now(), extension)
+
+    def __eq__(self, other):
+        return isinstance(other, ShardedUploadTo) and other.directory == self.directory
+
+
+def sharded_target(directory, name, modified):
+    """
+    Where ``shard_media`` moves the legacy file ``name``. Derived from the old
+    name and the file's mtime, so an interrupted run picks the same target again.
+    """
+    key = uuid.uuid5(uuid.NAMESPACE_URL, name).hex
+    when = datetime.fromtimestamp(modified, tz=dt_timezone.utc)
+    return sharded_name(directory, key, when, os.path.splitext(name)[1])
@@ -0,0 +1,97 @@
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+from .imaging import process_image
+
+RENDITION_WIDTHS = tuple(getattr(settings, 'MEDIA_RENDITION_WIDTHS', (160, 480, 960, 1600)))
+RENDITION_FORMATS = tuple(getattr(settings, 'MEDIA_RENDITION_FORMATS', ('webp', 'jpeg')))
+RENDITION_QUALITY = getattr(settings, 'MEDIA_RENDITION_QUALITY', 80)
+
+
+def render_job(name):
+    """
+    Arguments for ``process_image`` on the stored file ``name``.
+    """
+    return (str(settings.MEDIA_ROOT), name, RENDITION_WIDTHS, RENDITION_FORMATS, RENDITION_QUALITY)
+
+
+def rendition_files(renditions):
+    return [name for sizes in renditions.get('formats', {}).values() for name in sizes.values()]
+
+
+def save_processed(model, pk, source, result):
+    """
+    Attach the renditions and metadata from ``process_image`` to row ``pk``,
+    unless its image was replaced in the meantime. The payload changed, so
+    ``updated_at`` moves too; this bypasses signals, so cached responses are
+    retired here.
+    """
+    from core.response_cache import bump_versions
+
+    updated = model.objects.filter(pk=pk, image=source).update(
+        renditions={'source': source, 'formats': result['renditions']},
+        updated_at=timezone.now(),
+        **result['info'],
+    )
+    if updated:
+        bump_versions(model)
+    return updated
+
+
+def copy_processed(instance):
+    """
+    Reuse what the pipeline already derived for another row holding the same
+    stored file, as happens with deduplicated uploads. Returns True if copied.
+    """
+    model, name = type(instance), instance.image.name
+    values = model.objects.filter(image=name, renditions__source=name).exclude(
+        pk=instance.pk
+    ).values(*model.PROCESSED_FIELDS).first()
+    if values is None:
+        return False
+    model.objects.filter(pk=instance.pk, image=name).update(updated_at=timezone.now(), **values)
+    for field, value in values.items():
+        setattr(instance, field, value)
+    return True
+
+
+def render_image(model_label, pk, source):
+    """
+    Background job: render ``source`` and store the result on row ``pk``.
+    Errors propagate so the queue retries; a row whose image has since been
+    replaced is skipped.
+    """
+    model = apps.get_model(model_label)
+    if not model.objects.filter(pk=pk, image=source).exists():
+        return
+    save_processed(model, pk, source, process_image(*render_job(source)))
+
+
+def schedule_renditions(instance):
+    """
+    Queue renditions and metadata for ``instance.image`` as a background job,
+    committed together with the upload and rendered by ``manage.py run_workers``.
+    """
+    from core.tasks import enqueue
+
+    enqueue('media.renditions.render_image', instance._meta.label, instance.pk, instance.image.name)
+
+
+def srcset(renditions, build_url):
+    """
+    ``{format: "url 160w, url 480w, ..."}`` for the stored ``renditions``
+    """
+    return {
+        fmt: ', '.join(
+            f'{build_url(name)} {width}w'
+            for width, name in sorted(sizes.items(), key=lambda item: int(item[0]))
+        )
+        for fmt, sizes in renditions.get('formats', {}).items()
+    }
+
+
+def smallest_rendition(renditions, fmt='jpeg'):
+    sizes = renditions.get('formats', {}).get(fmt)
+    if not sizes:
+        return None
+    return sizes[min(sizes, key=int)]
@@ -0,0 +1,187 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over integer hashes under Hamming distance. A search
+    for everything within ``d`` bits only descends into children whose edge
+    distance lies in ``[dist - d, dist + d]``, so it visits a small fraction of
+    the tree for the tight radii used for near-duplicates.
+    """
+
+    def __init__(self):
+        # Nodes are [hash, items, {edge distance: child}]
+        self.root = None
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """
+        ``[(distance, item, stored hash)]`` for items within ``max_distance`` bits
+        """
+        results = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            stored, items, children = stack.pop()
+            distance = hamming(value, stored)
+            if distance <= max_distance:
+                results.extend((distance, item, stored) for item in items)
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return results
+
+
+class PerceptualIndex:
+    """
+    In-process BK-tree over ``model.perceptual_hash``.
+
+    Each lookup first pulls rows touched since the previous one (a cheap
+    ``updated_at`` range query), so freshly processed uploads are found
+    immediately. Entries whose hash changed are skipped at query time, and
+    the tree is rebuilt from scratch every ``rebuild_interval`` seconds to
+    drop them; that rebuild runs on a background thread while lookups keep
+    using the current tree, so only the first lookup in a process waits for
+    a full load. The index lock is only held to read, extend or swap the
+    tree; database reads and builds happen outside it, so lookups never
+    queue behind them. Deleted rows are filtered out by the caller's own
+    lookup.
+    """
+
+    def __init__(self, model_label, rebuild_interval=600):
+        self.model_label = model_label
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._tree = None
+        self._hashes = {}
+        self._built_at = 0
+        self._synced_at = None
+        self._rebuilding = False
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def _rows(self, queryset):
+        rows = queryset.exclude(perceptual_hash='').values_list('pk', 'perceptual_hash')
+        return ((pk, int(value, 16)) for pk, value in rows.iterator(chunk_size=5000))
+
+    def _build(self):
+        started = timezone.now()
+        tree, hashes = BKTree(), {}
+        for pk, value in self._rows(self.model.objects.all()):
+            tree.add(value, pk)
+            hashes[pk] = value
+        return tree, hashes, started
+
+    def _install(self, tree, hashes, started):
+        # Rows changed while the build ran are picked up by the next refresh
+        self._tree, self._hashes = tree, hashes
+        self._built_at = time.monotonic()
+        self._synced_at = started
+
+    def _rebuild(self):
+        try:
+            built = self._build()
+            with self._lock:
+                self._install(*built)
+        except Exception:
+            logger.exception('Rebuilding the %s perceptual index failed', self.model_label)
+            with self._lock:
+                # Keep the current tree and try again after another interval
+                self._built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._rebuilding = False
+            connection.close()
+
+    def refresh(self):
+        with self._lock:
+            tree, synced_at = self._tree, self._synced_at
+            if tree is not None and not self._rebuilding \
+                    and time.monotonic() - self._built_at > self.rebuild_interval:
+                self._rebuilding = True
+                threading.Thread(target=self._rebuild, name='perceptual-index-rebuild', daemon=True).start()
+        if tree is None:
+            with self._load_lock:
+                # Another lookup may have finished the first load meanwhile
+                if self._tree is None:
+                    built = self._build()
+                    with self._lock:
+                        self._install(*built)
+            return
+
+        now = timezone.now()
+        # Overlap slightly so a row committed mid-refresh is not missed
+        changed = list(self._rows(self.model.objects.filter(updated_at__gte=synced_at - timedelta(seconds=5))))
+        with self._lock:
+            if self._tree is not tree:
+                # A rebuild was swapped in meanwhile; it re-syncs from its own start
+                return
+            for pk, value in changed:
+                if self._hashes.get(pk) != value:
+                    self._tree.add(value, pk)
+                    self._hashes[pk] = value
+            self._synced_at = max(self._synced_at, now)
+
+    def search(self, value, max_distance, exclude=None):
+        """
+        ``[(distance, pk)]`` nearest first for rows within ``max_distance`` bits of ``value``
+        """
+        self.refresh()
+        if isinstance(value, str):
+            value = int(value, 16)
+        with self._lock:
+            matches = self._tree.search(value, max_distance)
+            current = self._hashes
+            found = {
+                pk: distance for distance, pk, stored in matches
+                if pk != exclude and current.get(pk) == stored
+            }
+        return sorted((distance, pk) for pk, distance in found.items())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._hashes),
+                'nodes': self._tree.size if self._tree is not None else 0,
+                'rebuild_interval': self.rebuild_interval,
+            }
+
+
+DUPLICATE_MAX_DISTANCE = getattr(settings, 'PHOTO_DUPLICATE_MAX_DISTANCE', 10)
+
+photo_index = PerceptualIndex(
+    'core.Photo', rebuild_interval=getattr(settings, 'PHOTO_DUPLICATE_INDEX_REBUILD', 600)
+)
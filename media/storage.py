@@ -0,0 +1,129 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+# Top-level MEDIA_ROOT directories that hold uploads. MEDIA_ROOT also holds
+# the media app's own source, which must never be served or swept.
+UPLOAD_DIRECTORIES = frozenset(getattr(
+    settings, 'MEDIA_UPLOAD_DIRECTORIES', ('photos', 'rewards', 'documents', 'profile_pics')
+))
+
+CONTENT_ADDRESS = re.compile(
+    r'^(?:(?P<directory>.+)/)?[0-9a-f]{2}/[0-9a-f]{2}/(?P<sha256>[0-9a-f]{64})(?P<extension>\.\w+)?$'
+)
+
+
+def content_address(directory, sha256, extension=''):
+    """
+    ``photos/9f/86/9f86d0...08.jpg``: two levels of fan-out keep directories small
+    """
+    parts = [directory] if directory else []
+    return '/'.join(parts + [sha256[:2], sha256[2:4], sha256 + extension.lower()])
+
+
+def parse_content_address(name):
+    """
+    The SHA-256 embedded in a content-addressed ``name``, or None for legacy paths
+    """
+    match = CONTENT_ADDRESS.match(name or '')
+    return match.group('sha256') if match else None
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """
+    ``(sha256 hex digest, size)`` of the file at ``path``, read in chunks
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def link_or_copy(source, target):
+    """
+    Make ``target`` a hard link to ``source``, or a copy across filesystems
+    """
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if os.path.lexists(target):
+        # Left by an interrupted run; replace it rather than trust it
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores each upload under the SHA-256 of its bytes, inside the directory
+    its ``upload_to`` asked for. The digest is computed while the upload is
+    streamed to a temporary file, so identical content lands on the same
+    name and a duplicate costs no extra disk space.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name depends only on the content, so never add a suffix
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1]
+        staging = self.path(directory)
+        os.makedirs(staging, exist_ok=True)
+
+        digest = hashlib.sha256()
+        handle, temp_path = tempfile.mkstemp(dir=staging, prefix='.upload-')
+        try:
+            with os.fdopen(handle, 'wb') as target:
+                if hasattr(content, 'seek') and content.seekable():
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    target.write(chunk)
+
+            return self.adopt(temp_path, directory, digest.hexdigest(), extension)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def adopt(self, temp_path, directory, sha256, extension='', keep=False):
+        """
+        Move the already-hashed file at ``temp_path`` (on the same filesystem)
+        to its content address and return the stored name. If those bytes are
+        already stored, the temporary file is simply dropped; the blob is
+        reserved first so a concurrent purge cannot remove the file in between.
+        With ``keep`` the file is linked instead and ``temp_path`` left alone.
+        """
+        from .dedup import reserved
+
+        name = content_address(directory, sha256, extension)
+        full_path = self.path(name)
+        with reserved(name, os.path.getsize(temp_path)):
+            if os.path.exists(full_path):
+                # Same bytes already stored: keep the existing file
+                if not keep:
+                    os.remove(temp_path)
+            elif keep:
+                link_or_copy(temp_path, full_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                os.replace(temp_path, full_path)
+        return name
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def get_content_addressed_storage():
+    return content_addressed_storage
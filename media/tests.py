@@ -1,3 +1,296 @@
-from django.test import TestCase
-
-# Create your tests here.
+import fcntl
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from core.activity import activity_buffer
+from core.models import BackgroundJob, Category, Document, Photo, User
+from core.tasks import run_pending
+from .models import Blob, Upload
+from .renditions import rendition_files
+from .similarity import PerceptualIndex
+from .storage import content_address, content_addressed_storage
+from .uploads import write_chunk
+
+
+class MediaTestCase(TestCase):
+    """
+    A user and an empty MEDIA_ROOT of its own for every test.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Flush sampled last_activity writes while the test database exists
+        self.addCleanup(activity_buffer.flush)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='alice', email='alice@example.com', password='pw-12345!',
+            first_name='Alice', last_name='Tester'
+        )
+        self.client.force_authenticate(self.user)
+
+    def media_path(self, name):
+        return content_addressed_storage.path(name)
+
+
+class ChunkedUploadTests(MediaTestCase):
+    content = b'0123456789'
+
+    def start(self):
+        response = self.client.post('/api/document-uploads/', {
+            'title': 'Thesis', 'document_type': 'book', 'filename': 'thesis.PDF', 'size': len(self.content),
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['offset'], 0)
+        return f"/api/document-uploads/{response.json()['id']}/"
+
+    def put(self, url, start, body, content_range=True):
+        if content_range:
+            end = start + len(body) - 1
+            return self.client.put(
+                url, body, content_type='application/octet-stream',
+                HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.content)}'
+            )
+        return self.client.put(f'{url}?offset={start}', body, content_type='application/octet-stream')
+
+    def test_assembles_chunks_into_a_content_addressed_document(self):
+        url = self.start()
+        self.assertEqual(self.put(url, 0, self.content[:4]).json()['offset'], 4)
+        self.assertEqual(self.client.get(url).json()['offset'], 4)
+        self.assertEqual(self.put(url, 4, self.content[4:], content_range=False).json()['offset'], 10)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'{url}finalize/')
+        self.assertEqual(response.status_code, 201)
+        document = Document.objects.get()
+        name = content_address('documents', hashlib.sha256(self.content).hexdigest(), '.pdf')
+        self.assertEqual(document.file.name, name)
+        self.assertEqual((document.title, document.uploaded_by), ('Thesis', self.user))
+        with open(self.media_path(name), 'rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertEqual(Blob.objects.get(name=name).ref_count, 1)
+        self.assertFalse(Upload.objects.exists())
+        self.assertEqual(
+            [entry for entry in os.listdir(self.media_path('documents')) if entry.startswith('.')], []
+        )
+
+    def test_identical_uploads_share_one_file(self):
+        for _ in range(2):
+            url = self.start()
+            self.put(url, 0, self.content)
+            self.assertEqual(self.client.post(f'{url}finalize/').status_code, 201)
+        names = set(Document.objects.values_list('file', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(Blob.objects.get(name=names.pop()).ref_count, 2)
+
+    def test_finalize_can_be_retried_after_a_failed_create(self):
+        url = self.start()
+        self.put(url, 0, self.content)
+        self.client.raise_request_exception = False
+        with mock.patch.object(Document.objects, 'create', side_effect=IntegrityError):
+            self.assertEqual(self.client.post(f'{url}finalize/').status_code, 500)
+        self.assertEqual(Upload.objects.get().offset, len(self.content))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(f'{url}finalize/').status_code, 201)
+        document = Document.objects.get()
+        with document.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertEqual(Blob.objects.get(name=document.file.name).ref_count, 1)
+        self.assertFalse(Upload.objects.exists())
+        self.assertEqual(
+            [entry for entry in os.listdir(self.media_path('documents')) if entry.startswith('.')], []
+        )
+
+    def test_rejects_out_of_order_and_oversized_chunks(self):
+        url = self.start()
+        self.put(url, 0, self.content[:4])
+
+        response = self.put(url, 2, self.content[2:6])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 4)
+        self.assertEqual(self.put(url, 4, self.content[4:] + b'extra').status_code, 400)
+
+        response = self.client.post(f'{url}finalize/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 4)
+        self.assertFalse(Document.objects.exists())
+
+    def test_short_read_keeps_what_arrived(self):
+        url = self.start()
+        upload = Upload.objects.get()
+        # The connection drops after two of the four announced bytes
+        upload = write_chunk(upload, 0, io.BytesIO(self.content[:2]), 4)
+        self.assertEqual(upload.offset, 2)
+
+        self.put(url, 2, self.content[2:])
+        self.assertEqual(self.client.post(f'{url}finalize/').status_code, 201)
+        with Document.objects.get().file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+
+    def test_refuses_a_chunk_while_another_is_being_written(self):
+        url = self.start()
+        temp_path = self.media_path(Upload.objects.get().temp_name)
+        with open(temp_path, 'r+b') as writer:
+            fcntl.flock(writer, fcntl.LOCK_EX)
+            self.assertEqual(self.put(url, 0, self.content[:4]).status_code, 409)
+        self.assertEqual(self.put(url, 0, self.content[:4]).json()['offset'], 4)
+        # Written in place, with no spool file next to it
+        self.assertEqual(
+            [entry for entry in os.listdir(self.media_path('documents')) if entry.startswith('.')],
+            [os.path.basename(temp_path)],
+        )
+
+    def test_uploads_are_private_and_can_be_aborted(self):
+        url = self.start()
+        temp_path = self.media_path(Upload.objects.get().temp_name)
+        self.assertTrue(os.path.exists(temp_path))
+
+        self.client.force_authenticate(User.objects.create_user(username='bob', password='pw-12345!'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(Upload.objects.exists())
+        self.assertFalse(os.path.exists(temp_path))
+
+
+
+class RenditionTests(MediaTestCase):
+    def test_uploads_queue_renditions_for_the_workers(self):
+        image = io.BytesIO()
+        Image.new('RGB', (800, 600), (20, 130, 30)).save(image, 'JPEG')
+        category = Category.objects.create(name='Graduation', created_by=self.user)
+        response = self.client.post('/api/photos/', {
+            'title': 'Ceremony', 'category': category.pk, 'photo_type': 'general',
+            'image': SimpleUploadedFile('ceremony.jpg', image.getvalue(), 'image/jpeg'),
+        })
+        self.assertEqual(response.status_code, 201)
+        photo = Photo.objects.get()
+        # Nothing is rendered on the request path
+        self.assertEqual(photo.renditions, {})
+        self.assertEqual(BackgroundJob.objects.get().task, 'media.renditions.render_image')
+
+        self.assertEqual(run_pending(), (1, 0))
+        photo.refresh_from_db()
+        self.assertEqual(photo.renditions['source'], photo.image.name)
+        self.assertEqual((photo.image_width, photo.image_height), (800, 600))
+        for name in rendition_files(photo.renditions):
+            self.assertTrue(os.path.exists(self.media_path(name)), name)
+        self.assertFalse(BackgroundJob.objects.exists())
+
+class GcMediaTests(MediaTestCase):
+    def store(self, name, content=b'bytes'):
+        path = self.media_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as target:
+            target.write(content)
+        return name
+
+    def blob(self, content, **fields):
+        sha256 = hashlib.sha256(content).hexdigest()
+        name = self.store(content_address('photos', sha256, '.jpg'), content)
+        Blob.objects.create(sha256=sha256, name=name, size=len(content), **fields)
+        return name
+
+    def gc(self, **options):
+        call_command('gc_media', stdout=io.StringIO(), **options)
+
+    def exists(self, name):
+        return os.path.exists(self.media_path(name))
+
+    def test_removes_unreferenced_files_outside_the_grace_period(self):
+        orphan = self.store('photos/orphan.jpg')
+        kept = self.store('documents/kept.pdf')
+        Document.objects.create(title='Kept', document_type='book', file=kept, uploaded_by=self.user)
+
+        self.gc()
+        self.assertTrue(self.exists(orphan))
+        self.gc(dry_run=True, grace_hours=0)
+        self.assertTrue(self.exists(orphan))
+        self.gc(grace_hours=0)
+        self.assertFalse(self.exists(orphan))
+        self.assertTrue(self.exists(kept))
+
+    def test_purges_blobs_without_references(self):
+        unreferenced = self.blob(b'unreferenced', ref_count=0)
+        referenced = self.blob(b'referenced', ref_count=1)
+        reserved = self.blob(b'reserved', ref_count=0, reserved_until=timezone.now() + timedelta(minutes=5))
+        lapsed = self.blob(b'lapsed', ref_count=0, reserved_until=timezone.now() - timedelta(minutes=5))
+
+        self.gc(grace_hours=0)
+        self.assertEqual(
+            [self.exists(name) for name in (unreferenced, referenced, reserved, lapsed)],
+            [False, True, True, False],
+        )
+        self.assertEqual(
+            set(Blob.objects.values_list('name', flat=True)), {referenced, reserved}
+        )
+
+    def test_keeps_blobs_referenced_after_the_scan_started(self):
+        name = self.blob(b're-referenced', ref_count=1)
+        # As if a new record took a reference once the names were loaded
+        with mock.patch('media.management.commands.gc_media.referenced_names', return_value=set()):
+            self.gc(grace_hours=0)
+        self.assertTrue(self.exists(name))
+        self.assertEqual(Blob.objects.get(name=name).ref_count, 1)
+
+
+class PerceptualIndexTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name='Graduation', created_by=self.user)
+        self.index = PerceptualIndex('core.Photo')
+
+    def photo(self, perceptual_hash):
+        return Photo.objects.create(
+            title=perceptual_hash, image=f'photos/{perceptual_hash}.jpg', category=self.category,
+            uploaded_by=self.user, perceptual_hash=perceptual_hash,
+        )
+
+    def test_finds_near_duplicates_and_follows_changes(self):
+        original = self.photo('ffff0000ffff0000')
+        near = self.photo('ffff0000ffff0003')
+        far = self.photo('0000ffff0000ffff')
+        self.assertEqual(self.index.search(original.perceptual_hash, 4, exclude=original.pk), [(2, near.pk)])
+
+        Photo.objects.filter(pk=far.pk).update(perceptual_hash='ffff0000ffff0001', updated_at=timezone.now())
+        Photo.objects.filter(pk=near.pk).update(perceptual_hash='0000000000000000', updated_at=timezone.now())
+        self.assertEqual(self.index.search(original.perceptual_hash, 4, exclude=original.pk), [(1, far.pk)])
+
+    def test_lookups_do_not_wait_for_a_rebuild(self):
+        original = self.photo('ffff0000ffff0000')
+        self.index.search(original.perceptual_hash, 4)
+        self.index.rebuild_interval = 0
+        building, release = threading.Event(), threading.Event()
+
+        def slow_build():
+            building.set()
+            release.wait(5)
+            raise RuntimeError('abandoned')
+
+        with mock.patch.object(self.index, '_build', side_effect=slow_build), \
+                self.assertLogs('media.similarity', 'ERROR'):
+            self.index.search(original.perceptual_hash, 4)
+            self.assertTrue(building.wait(5))
+            self.assertEqual(self.index.search(original.perceptual_hash, 4), [(0, original.pk)])
+            release.set()
+            while self.index._rebuilding:
+                time.sleep(0.01)
@@ -0,0 +1,196 @@
+import fcntl
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import Upload
+from .storage import UPLOAD_DIRECTORIES, content_addressed_storage
+
+CHUNK_MAX_SIZE = getattr(settings, 'MEDIA_UPLOAD_CHUNK_MAX_SIZE', 8 * 1024 * 1024)
+MAX_SIZE = getattr(settings, 'MEDIA_UPLOAD_MAX_SIZE', 500 * 1024 * 1024)
+EXPIRY = timedelta(hours=getattr(settings, 'MEDIA_UPLOAD_EXPIRY_HOURS', 24))
+READ_SIZE = 64 * 1024
+
+
+class UploadBusy(Exception):
+    """
+    Another request is still writing a chunk of the same upload.
+    """
+
+
+class OffsetMismatch(Exception):
+    """
+    The chunk does not start where the upload left off; ``offset`` says where that is.
+    """
+
+    def __init__(self, offset):
+        super().__init__(f'Expected a chunk starting at byte {offset}')
+        self.offset = offset
+
+
+# Running SHA-256 per upload, so each byte is hashed once as it arrives. This
+# is per process: when a chunk lands on another worker, or after a restart,
+# the digest is rebuilt from the bytes already on disk.
+_digests = OrderedDict()
+_digests_lock = threading.Lock()
+MAX_DIGESTS = 256
+
+
+def _take_digest(upload, offset):
+    with _digests_lock:
+        entry = _digests.pop(upload.pk, None)
+    if entry is not None and entry[0] == offset:
+        return entry[1]
+    digest = hashlib.sha256()
+    remaining = offset
+    with open(content_addressed_storage.path(upload.temp_name), 'rb') as source:
+        while remaining:
+            chunk = source.read(min(READ_SIZE * 16, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest
+
+
+def _keep_digest(upload, offset, digest):
+    with _digests_lock:
+        _digests[upload.pk] = (offset, digest)
+        while len(_digests) > MAX_DIGESTS:
+            _digests.popitem(last=False)
+
+
+def _forget_digest(upload):
+    with _digests_lock:
+        _digests.pop(upload.pk, None)
+
+
+def start_upload(user, directory, filename, size, metadata):
+    upload = Upload.objects.create(
+        user=user, directory=directory, filename=filename, size=size, metadata=metadata
+    )
+    path = content_addressed_storage.path(upload.temp_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return upload
+
+
+def write_chunk(upload, start, stream, length):
+    """
+    Append ``length`` bytes read from ``stream`` at byte ``start``, which must
+    be the upload's current offset. A short read (dropped connection) keeps
+    what arrived, so the client resumes from the returned offset.
+
+    The body goes straight into the upload file. An exclusive ``flock`` on
+    that file keeps a retried chunk from interleaving with the original
+    while the body is read, without holding a database transaction open;
+    the offset is then checked and advanced by one conditional UPDATE.
+    """
+    if start != upload.offset:
+        raise OffsetMismatch(upload.offset)
+    if start + length > upload.size:
+        raise ValueError('Chunk extends past the declared upload size')
+
+    with open(content_addressed_storage.path(upload.temp_name), 'r+b') as target:
+        try:
+            fcntl.flock(target, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadBusy()
+        # Another request may have written this chunk before we got the lock
+        offset = Upload.objects.filter(pk=upload.pk).values_list('offset', flat=True).first()
+        if offset is None:
+            raise Upload.DoesNotExist()
+        if start != offset:
+            raise OffsetMismatch(offset)
+
+        digest = _take_digest(upload, start)
+        target.seek(start)
+        # Drop anything left by an earlier, interrupted attempt at this chunk
+        target.truncate()
+        written = 0
+        while written < length:
+            chunk = stream.read(min(READ_SIZE, length - written))
+            if not chunk:
+                break
+            target.write(chunk)
+            digest.update(chunk)
+            written += len(chunk)
+        target.flush()
+
+        if not Upload.objects.filter(pk=upload.pk, offset=start).update(
+            offset=start + written, updated_at=timezone.now()
+        ):
+            # Aborted or expired while the body was arriving
+            raise Upload.DoesNotExist()
+    upload.offset = start + written
+    _keep_digest(upload, upload.offset, digest)
+    return upload
+
+
+def finish_upload(upload):
+    """
+    Link a complete upload to its content address and return the stored
+    name. The caller creates the record pointing at it and deletes
+    ``upload`` in the same transaction; the upload file is only removed once
+    that commits, so a finalize that fails can simply be retried.
+    """
+    if upload.offset != upload.size:
+        raise OffsetMismatch(upload.offset)
+    digest = _take_digest(upload, upload.size)
+    extension = os.path.splitext(upload.filename)[1]
+    name = content_addressed_storage.adopt(
+        content_addressed_storage.path(upload.temp_name), upload.directory, digest.hexdigest(), extension,
+        keep=True,
+    )
+    _forget_digest(upload)
+    temp_name = upload.temp_name
+    transaction.on_commit(lambda: content_addressed_storage.delete(temp_name))
+    return name
+
+
+def abort_upload(upload):
+    _forget_digest(upload)
+    content_addressed_storage.delete(upload.temp_name)
+    upload.delete()
+
+
+def expire_uploads(older_than=EXPIRY, dry_run=False):
+    """
+    Remove uploads untouched for ``older_than`` plus orphaned ``.upload-*``
+    files (left by crashed saves) of the same age from the upload
+    directories. Returns ``(sessions, files, bytes)`` removed.
+    """
+    cutoff = timezone.now() - older_than
+    sessions = files = freed = 0
+    for upload in Upload.objects.filter(updated_at__lt=cutoff).iterator():
+        path = content_addressed_storage.path(upload.temp_name)
+        freed += os.path.getsize(path) if os.path.exists(path) else 0
+        sessions += 1
+        if not dry_run:
+            abort_upload(upload)
+
+    active = {upload.temp_name for upload in Upload.objects.only('pk', 'directory')}
+    cutoff_time = time.time() - older_than.total_seconds()
+    for directory in sorted(UPLOAD_DIRECTORIES):
+        try:
+            entries = list(os.scandir(content_addressed_storage.path(directory)))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            name = f'{directory}/{entry.name}'
+            if not entry.name.startswith('.upload-') or name in active or not entry.is_file():
+                continue
+            st = entry.stat()
+            if st.st_mtime >= cutoff_time:
+                continue
+            files += 1
+            freed += st.st_size
+            if not dry_run:
+                os.remove(entry.path)
+    return sessions, files, freed
@@ -1,3 +1,160 @@
-from django.shortcuts import render
-
-# Create your views here.
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from core.conditional import check_not_modified
+from .storage import UPLOAD_DIRECTORIES, parse_content_address
+
+ACCEL = getattr(settings, 'MEDIA_ACCEL', '').lower()  # '', 'x-accel-redirect' or 'x-sendfile'
+ACCEL_PREFIX = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+MAX_AGE = getattr(settings, 'MEDIA_CACHE_MAX_AGE', 60 * 60)
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def resolve(path):
+    """
+    Absolute path of the servable media file ``path``, or raise Http404.
+    Only upload directories are served, and temporary ``.upload-*`` files
+    and other dotfiles are never exposed.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    parts = path.split('/')
+    if len(parts) < 2 or parts[0] not in UPLOAD_DIRECTORIES or any(part.startswith('.') for part in parts):
+        raise Http404()
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        st = os.stat(full_path)
+    except (OSError, ValueError):
+        raise Http404()
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404()
+    return path, full_path, st
+
+
+def byte_range(header, size):
+    """
+    ``(start, end)`` inclusive for a single-range ``Range`` header; None to
+    send the whole file (absent, malformed or multi-range), or ``False`` when
+    the range cannot be satisfied.
+    """
+    match = RANGE.match(header.strip()) if header else None
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the final ``last`` bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+class RangeFile:
+    """
+    File object limited to ``length`` bytes from ``start``. Exposes ``fileno``
+    so servers that support ``wsgi.file_wrapper`` can still ``sendfile`` it.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def offload(path, full_path):
+    """
+    Empty response telling the front proxy which file to send. The proxy
+    then handles byte ranges itself.
+    """
+    response = HttpResponse()
+    if ACCEL == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = ACCEL_PREFIX.rstrip('/') + '/' + path
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Uploaded media with ETag / Last-Modified, single byte ranges and long-lived
+    caching. Content-addressed names never change content, so they are marked
+    immutable. With ``MEDIA_ACCEL`` set, nginx (``X-Accel-Redirect``) or
+    Apache/lighttpd (``X-Sendfile``) send the bytes instead of Python.
+    """
+    path, full_path, st = resolve(path)
+    size, last_modified = st.st_size, int(st.st_mtime)
+    sha256 = parse_content_address(path)
+    etag = f'"{sha256}"' if sha256 else f'"{last_modified:x}-{size:x}"'
+    cache_control = IMMUTABLE if sha256 else f'public, max-age={MAX_AGE}'
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    response = check_not_modified(request, etag, last_modified)
+    if response is not None:
+        if response.status_code == 304:
+            response['Cache-Control'] = cache_control
+        return response
+
+    if ACCEL in ('x-accel-redirect', 'x-sendfile'):
+        response = offload(path, full_path)
+        response['Content-Type'] = content_type
+    else:
+        requested = byte_range(request.headers.get('Range'), size)
+        if_range = request.headers.get('If-Range')
+        if requested is not None and if_range and if_range != etag:
+            # The client's partial copy is stale: send the whole file instead
+            requested = None
+        if requested is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            response['Accept-Ranges'] = 'bytes'
+            return response
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=content_type)
+            response['Content-Length'] = size
+        elif requested is None:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        else:
+            start, end = requested
+            length = end - start + 1
+            response = FileResponse(
+                RangeFile(open(full_path, 'rb'), start, length), status=206, content_type=content_type
+            )
+            response['Content-Length'] = length
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Accept-Ranges'] = 'bytes'
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Cache-Control'] = cache_control
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
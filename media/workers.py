@@ -0,0 +1,45 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+def submit_bounded(executor, fn, jobs, window):
+    """
+    Submit ``fn(*args)`` for every ``(key, args)`` in ``jobs`` while keeping
+    at most ``window`` futures in flight, and yield ``(key, future)`` as each
+    one completes. Lets backfills stream over arbitrarily many rows without
+    queueing them all up front.
+    """
+    pending = {}
+    jobs = iter(jobs)
+    exhausted = False
+    while pending or not exhausted:
+        while not exhausted and len(pending) < window:
+            try:
+                key, args = next(jobs)
+            except StopIteration:
+                exhausted = True
+                break
+            pending[executor.submit(fn, *args)] = key
+        if not pending:
+            break
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future
+
+
+def throttled(jobs, rate):
+    """
+    Yield from ``jobs`` at no more than ``rate`` items per second (unlimited
+    if falsy), so a bulk migration leaves disk bandwidth for live traffic.
+    """
+    if not rate:
+        yield from jobs
+        return
+    interval = 1.0 / rate
+    next_at = time.monotonic()
+    for job in jobs:
+        delay = next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        next_at = max(next_at, time.monotonic() - interval) + interval
+        yield job
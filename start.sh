@@ -0,0 +1,19 @@
+#!/usr/bin/env bash
+# Exit on error
+set -o errexit
+
+# Background jobs and maintenance (gc_media, expire_uploads) work on the files
+# under MEDIA_ROOT, which lives on this service's filesystem, so the workers
+# and the scheduler run here next to gunicorn rather than as separate
+# services. Restart them if they exit.
+while true; do
+    python manage.py run_workers --concurrency 2 || true
+    sleep 5
+done &
+
+while true; do
+    python manage.py run_scheduler || true
+    sleep 5
+done &
+
+exec gunicorn backend.wsgi:application
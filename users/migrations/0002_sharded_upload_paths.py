@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:53
+
+from django.db import migrations, models
+import media.paths
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, upload_to=media.paths.ShardedUploadTo('profile_pics')),
+        ),
+    ]
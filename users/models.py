@@ -1,10 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from media.paths import ShardedUploadTo
 
 class UserProfile(models.Model):
     user = models.OneToOneField('core.User', on_delete=models.CASCADE)
     bio = models.TextField(blank=True)
-    profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to=ShardedUploadTo('profile_pics'), blank=True, null=True)
     phone_number = models.CharField(max_length=15, blank=True)
     social_links = models.JSONField(default=dict, blank=True)  # Store social media links
     